@@ -36,6 +36,16 @@ PUBLIC_URL = os.environ["PUBLIC_URL"].rstrip("/")
 
 PID_SERVICE_URL = os.environ["PID_SERVICE_URL"]
 
+# Maximum number of concurrent requests to the PID service.
+PID_SERVICE_CONCURRENCY = 8
+
+# Outbound HTTP requests, see instruments.httpclient. Timeouts are given as
+# (connect, read) in seconds.
+HTTP_TIMEOUT = (3.05, 30)
+HTTP_TIMEOUTS = {urlparse(PID_SERVICE_URL).hostname: (3.05, 60)}
+HTTP_RETRIES = 3
+HTTP_POOL_SIZE = 10
+
 ALLOWED_HOSTS = [urlparse(PUBLIC_URL).hostname]
 
 CSRF_TRUSTED_ORIGINS = [PUBLIC_URL]
@@ -54,10 +64,12 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "sorl.thumbnail",
 ]
 
 MIDDLEWARE = [
+    "instruments.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -103,6 +115,22 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Rendered PIDINST documents, invalidated by instruments.signals.
+    "documents": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "instruments_document_cache",
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -151,6 +179,8 @@ MEDIA_URL = "media/"
 
 MEDIA_ROOT = "./media/"
 
+VOCABULARY_CACHE_DIR = BASE_DIR / "cache" / "vocabulary"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -168,6 +198,12 @@ LOGGING = {
         "handlers": ["console"],
         "level": "WARNING",
     },
+    "loggers": {
+        # Set to INFO to log query and HTTP timings of every request.
+        "instruments.middleware": {
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "WARNING"),
+        },
+    },
 }
 
 handler = ThumbnailLogHandler()
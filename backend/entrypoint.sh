@@ -14,5 +14,7 @@ if [ "$MODE" = "production" ]; then
 fi
 
 ./manage.py migrate --noinput
+./manage.py createcachetable
+./manage.py updatesearch --missing
 
 exec "$@"
@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 from django.db.models import QuerySet
 from django.forms import ModelForm
 from django.urls import reverse
+from django.utils import timezone
 from sorl.thumbnail.admin import AdminImageMixin
 
 from . import models
@@ -110,24 +111,35 @@ class InstrumentAdmin(AdminImageMixin, admin.ModelAdmin):
 
     @admin.action(description="Create PIDs for selected instruments")
     def create_pids(self, request, queryset: "QuerySet[models.Instrument]"):
-        created_pids = 0
-        try:
-            for obj in queryset:
-                obj.create_or_update_pid()
-                obj.update_related_pids()
-                created_pids += 1
-        except Exception as err:
-            self.message_user(request, f"Failed to create PID: {err}.", messages.ERROR)
-        if created_pids:
-            self.message_user(
-                request, f"Created {created_pids} PIDs successfully.", messages.SUCCESS
-            )
+        # Send the selected instruments even if they have not changed.
+        queryset.update(pid_payload_hash=None)
+        queued = 0
+        for obj in queryset:
+            models.PidJob.enqueue(obj)
+            queued += 1
+        self.message_user(
+            request, f"Queued {queued} PIDs for creation.", messages.SUCCESS
+        )
 
     def save_model(self, request, obj: models.Instrument, form, change):
         super().save_model(request, obj, form, change)
-        if obj.pid:
-            obj.create_or_update_pid()
-        obj.update_related_pids()
+        models.PidJob.enqueue(obj, register=obj.pid is not None)
+
+
+@admin.register(models.PidJob)
+class PidJobAdmin(admin.ModelAdmin):
+    list_display = ["instrument", "status", "attempts", "run_after", "updated_at"]
+    list_filter = ["status"]
+    ordering = ["-created_at"]
+    readonly_fields = ["created_at", "updated_at"]
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected jobs")
+    def retry(self, request, queryset: "QuerySet[models.PidJob]"):
+        count = queryset.update(
+            status=models.PidJob.PENDING, attempts=0, run_after=timezone.now()
+        )
+        self.message_user(request, f"Queued {count} jobs.", messages.SUCCESS)
 
 
 @admin.register(models.Location)
@@ -0,0 +1,56 @@
+import json
+from typing import Iterable
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import pidinst_xml
+from .models import Instrument
+from .version import __version__
+
+FORMATS = ("json", "xml")
+
+
+def _key(instrument_id: int, output_format: str) -> str:
+    return f"{__version__}:instrument:{instrument_id}:{output_format}"
+
+
+def _render(instru: Instrument) -> dict[str, bytes]:
+    pidinst = instru.pidinst()
+    return {
+        "json": json.dumps(pidinst, cls=DjangoJSONEncoder).encode(),
+        "xml": pidinst_xml.to_xml(pidinst),
+    }
+
+
+def _get_or_render(instru: Instrument, output_format: str) -> bytes:
+    cache = caches["documents"]
+    key = _key(instru.pk, output_format)
+    content = cache.get(key)
+    if content is None:
+        # Both formats are rendered from the same PIDINST document, so cache
+        # the other one as well.
+        documents = _render(instru)
+        cache.set_many({_key(instru.pk, fmt): documents[fmt] for fmt in FORMATS})
+        content = documents[output_format]
+    return content
+
+
+def get_json(instru: Instrument) -> bytes:
+    return _get_or_render(instru, "json")
+
+
+def get_xml(instru: Instrument) -> bytes:
+    return _get_or_render(instru, "xml")
+
+
+def invalidate(instrument_ids: Iterable[int]) -> None:
+    keys = [_key(pk, fmt) for pk in set(instrument_ids) for fmt in FORMATS]
+    if not keys:
+        return
+    cache = caches["documents"]
+    cache.delete_many(keys)
+    # Delete again after commit in case a concurrent request cached a document
+    # rendered from the data that was just replaced.
+    transaction.on_commit(lambda: cache.delete_many(keys))
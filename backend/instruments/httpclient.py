@@ -0,0 +1,116 @@
+"""Shared client for outbound HTTP requests.
+
+Connections are pooled and kept alive between requests, every request has a
+timeout and transient failures are retried. Request counts and latencies are
+collected per host.
+"""
+
+import contextlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Iterator
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_stats: defaultdict[str, dict[str, float]] = defaultdict(
+    lambda: {"requests": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0}
+)
+_stats_lock = threading.Lock()
+_tracked: ContextVar[list[float] | None] = ContextVar("tracked", default=None)
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=settings.HTTP_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                # PID registrations are keyed by UUID and can be repeated.
+                allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=settings.HTTP_POOL_SIZE,
+                pool_maxsize=settings.HTTP_POOL_SIZE,
+                max_retries=retry,
+            )
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _record(host: str, seconds: float, failed: bool) -> None:
+    with _stats_lock:
+        host_stats = _stats[host]
+        host_stats["requests"] += 1
+        host_stats["errors"] += failed
+        host_stats["seconds"] += seconds
+        host_stats["max_seconds"] = max(host_stats["max_seconds"], seconds)
+
+
+def stats() -> dict[str, dict[str, float]]:
+    """Return request counts and latencies per host since startup."""
+    with _stats_lock:
+        return {host: dict(values) for host, values in _stats.items()}
+
+
+def summary() -> list[str]:
+    """Describe `stats` with one line per host."""
+    return [
+        f"{host}: {values['requests']:.0f} requests, {values['errors']:.0f} "
+        f"errors, mean {values['seconds'] / values['requests']:.3f} s, "
+        f"max {values['max_seconds']:.3f} s"
+        for host, values in sorted(stats().items())
+    ]
+
+
+@contextlib.contextmanager
+def track() -> Iterator[list[float]]:
+    """Collect the durations of requests made in the current context."""
+    durations: list[float] = []
+    token = _tracked.set(durations)
+    try:
+        yield durations
+    finally:
+        _tracked.reset(token)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    host = urlsplit(url).hostname or ""
+    kwargs.setdefault(
+        "timeout", settings.HTTP_TIMEOUTS.get(host, settings.HTTP_TIMEOUT)
+    )
+    start = time.perf_counter()
+    failed = True
+    try:
+        response = _get_session().request(method, url, **kwargs)
+        failed = not response.ok
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        _record(host, seconds, failed)
+        if (durations := _tracked.get()) is not None:
+            durations.append(seconds)
+        logger.debug("%s %s took %.3f s", method, url, seconds)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
@@ -0,0 +1,163 @@
+import datetime
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import HttpResponseBase
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from instruments.models import Campaign, Contact, Instrument, PidJob
+from instruments.pidstub import PidServiceStub
+from instruments.version import __version__
+from logbook.models import LogEntry
+
+
+class Command(BaseCommand):
+    help = "Measures latency and query counts of the busiest endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="Number of requests per endpoint.",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="File for the results. Defaults to a timestamped file in "
+            "the benchmarks directory.",
+        )
+        parser.add_argument(
+            "--compare", type=Path, help="Compare with the results of an earlier run."
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        if iterations < 1:
+            raise CommandError("Iterations must be positive")
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        logging.disable(logging.INFO)
+        try:
+            # Changes made by the benchmark, such as new PIDs, are rolled back.
+            with transaction.atomic():
+                report = {
+                    "version": __version__,
+                    "created_at": created_at.isoformat(),
+                    "iterations": iterations,
+                    "database": {
+                        "instruments": Instrument.objects.count(),
+                        "campaigns": Campaign.objects.count(),
+                        "contacts": Contact.objects.count(),
+                        "log_entries": LogEntry.objects.count(),
+                    },
+                    "results": self._run(iterations),
+                }
+                transaction.set_rollback(True)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        output = options["output"] or (
+            settings.BASE_DIR
+            / "benchmarks"
+            / f"{created_at.strftime('%Y%m%dT%H%M%SZ')}.json"
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2) + "\n")
+
+        previous = {}
+        if options["compare"]:
+            previous = json.loads(options["compare"].read_text())["results"]
+        for name, result in report["results"].items():
+            line = (
+                f"{name:<16} median {result['median_ms']:8.1f} ms, "
+                f"p95 {result['p95_ms']:8.1f} ms, {result['queries']:3d} queries"
+            )
+            if old := previous.get(name):
+                change = result["median_ms"] / old["median_ms"] - 1
+                line += (
+                    f" (was {old['median_ms']:.1f} ms, {change:+.0%}, "
+                    f"{old['queries']} queries)"
+                )
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Saved results to {output}"))
+
+    def _run(self, iterations: int) -> dict[str, dict]:
+        sample = (
+            Instrument.objects.annotate(
+                component_count=Count("components", distinct=True),
+                campaign_count=Count("campaign", distinct=True),
+            )
+            .order_by("-component_count", "-campaign_count", "pk")
+            .first()
+        )
+        if sample is None:
+            raise CommandError("No instruments found, run gendata first")
+        without_pid = list(Instrument.objects.filter(pid__isnull=True)[:iterations])
+        if len(without_pid) < iterations:
+            raise CommandError(f"Need {iterations} instruments without PID")
+
+        host = settings.ALLOWED_HOSTS[0]
+        anonymous = Client(HTTP_HOST=host)
+        staff = Client(HTTP_HOST=host)
+        staff.force_login(User.objects.create_superuser("benchmark"))
+
+        def url(name: str, *args) -> str:
+            return reverse(name, args=args)
+
+        uuid = sample.uuid
+        results = {
+            "index": self._measure(iterations, lambda i: anonymous.get(url("index"))),
+        }
+        for output_format in ["json", "xml", "html"]:
+            path = url("instrument", uuid, output_format)
+            results[f"instrument.{output_format}"] = self._measure(
+                iterations, lambda i: anonymous.get(path)
+            )
+        results["pi"] = self._measure(
+            iterations, lambda i: anonymous.get(url("pi", uuid))
+        )
+        results["logbook:view"] = self._measure(
+            iterations, lambda i: staff.get(url("logbook:view", uuid))
+        )
+
+        def create_pid(i: int) -> HttpResponseBase:
+            response = staff.get(url("create_pid", without_pid[i].uuid))
+            PidJob.run_batch(PidJob.claim())
+            return response
+
+        with PidServiceStub() as stub, override_settings(PID_SERVICE_URL=stub.url):
+            results["create_pid"] = self._measure(iterations, create_pid)
+        return results
+
+    def _measure(
+        self, iterations: int, request: Callable[[int], HttpResponseBase]
+    ) -> dict:
+        durations = []
+        queries = 0
+        for i in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = request(i)
+                durations.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f"Request failed with {response.status_code}")
+            queries = max(queries, len(context.captured_queries))
+        durations.sort()
+        return {
+            "queries": queries,
+            "min_ms": durations[0],
+            "median_ms": statistics.median(durations),
+            "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "max_ms": durations[-1],
+        }
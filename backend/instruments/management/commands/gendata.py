@@ -0,0 +1,238 @@
+import datetime
+import random
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from instruments import search
+from instruments.models import (
+    Campaign,
+    Contact,
+    Instrument,
+    Location,
+    Model,
+    Organization,
+    Person,
+    RelatedIdentifier,
+    Type,
+    Variable,
+)
+from logbook.models import LogEntry
+
+START_DATE = datetime.date(2000, 1, 1)
+# Reserved top-level domain, so the PIDs cannot resolve to anything real.
+PID_PREFIX = "https://pid.invalid/synthetic/"
+
+
+class Command(BaseCommand):
+    help = "Fills the database with a synthetic registry for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--instruments",
+            type=int,
+            default=2000,
+            help="Number of instruments. Other objects are scaled to match.",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the random generator."
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run even if the application is not in development mode.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(
+                "Refusing to add synthetic data outside development mode, "
+                "use --force to override"
+            )
+        self.rng = random.Random(options["seed"])
+        with transaction.atomic():
+            instruments = self._generate(options["instruments"])
+        search.update_vectors(instrument.pk for instrument in instruments)
+
+    def _generate(self, count: int) -> list[Instrument]:
+        rng = self.rng
+        organizations = Organization.objects.bulk_create(
+            Organization(name=f"Synthetic organization {i}", acronym=f"SO{i}")
+            for i in range(count // 20 + 5)
+        )
+        types = Type.objects.bulk_create(
+            Type(name=f"Synthetic type {i}") for i in range(20)
+        )
+        variables = Variable.objects.bulk_create(
+            Variable(name=f"Synthetic variable {i}") for i in range(20)
+        )
+        models = Model.objects.bulk_create(
+            Model(name=f"Synthetic model {i}") for i in range(count // 20 + 5)
+        )
+        Model.manufacturers.through._default_manager.bulk_create(
+            Model.manufacturers.through(
+                model_id=model.pk, organization_id=rng.choice(organizations).pk
+            )
+            for model in models
+        )
+        Model.types.through._default_manager.bulk_create(
+            Model.types.through(model_id=model.pk, type_id=type_obj.pk)
+            for model in models
+            for type_obj in rng.sample(types, 2)
+        )
+        Model.variables.through._default_manager.bulk_create(
+            Model.variables.through(model_id=model.pk, variable_id=variable.pk)
+            for model in models
+            for variable in rng.sample(variables, 3)
+        )
+        locations = Location.objects.bulk_create(
+            Location(name=f"Synthetic site {i}") for i in range(count // 10 + 5)
+        )
+        persons = Person.objects.bulk_create(
+            Person(
+                first_name=f"First{i}",
+                last_name=f"Last{i}",
+                email_address=f"person{i}@example.com",
+            )
+            for i in range(count // 2 + 5)
+        )
+
+        instruments = []
+        for i in range(count):
+            uuid_ = uuid.UUID(int=rng.getrandbits(128), version=4)
+            instruments.append(
+                Instrument(
+                    uuid=uuid_,
+                    pid=(
+                        f"{PID_PREFIX}{uuid_.hex[:16]}" if rng.random() < 0.7 else None
+                    ),
+                    name=f"Synthetic instrument {i}",
+                    model=rng.choice(models) if rng.random() < 0.8 else None,
+                    description=f"Synthetic instrument number {i}.",
+                    serial_number=f"SN{rng.getrandbits(40):012d}",
+                )
+            )
+        instruments = Instrument.objects.bulk_create(instruments)
+        Instrument.owners.through._default_manager.bulk_create(
+            Instrument.owners.through(
+                instrument_id=instrument.pk, organization_id=organization.pk
+            )
+            for instrument in instruments
+            for organization in rng.sample(organizations, rng.randint(1, 2))
+        )
+        Instrument.types.through._default_manager.bulk_create(
+            Instrument.types.through(
+                instrument_id=instrument.pk, type_id=rng.choice(types).pk
+            )
+            for instrument in instruments
+            if instrument.model is None
+        )
+
+        campaigns: list[Campaign] = []
+        contacts: list[Contact] = []
+        identifiers: list[RelatedIdentifier] = []
+        for instrument in instruments:
+            campaigns.extend(
+                Campaign(
+                    instrument=instrument,
+                    location=rng.choice(locations),
+                    date_range=date_range,
+                )
+                for date_range in self._periods(rng.randint(1, 5))
+            )
+            contacts.extend(
+                Contact(
+                    instrument=instrument,
+                    person=rng.choice(persons),
+                    role=Contact.PI,
+                    date_range=date_range,
+                )
+                for date_range in self._periods(rng.randint(1, 3))
+            )
+            contacts.extend(
+                Contact(
+                    instrument=instrument,
+                    person=rng.choice(persons),
+                    role=Contact.EXTRA,
+                    date_range=(START_DATE, None),
+                )
+                for _ in range(rng.randint(0, 2))
+            )
+            identifiers.extend(
+                RelatedIdentifier(
+                    instrument=instrument,
+                    identifier=f"https://example.com/{instrument.uuid}/{j}",
+                    identifier_type="URL",
+                    relation_type="IsDescribedBy",
+                )
+                for j in range(rng.randint(0, 3))
+            )
+        Campaign.objects.bulk_create(campaigns)
+        Contact.objects.bulk_create(contacts)
+        RelatedIdentifier.objects.bulk_create(identifiers)
+
+        # Every tenth instrument is a station assembled from other instruments,
+        # which may in turn have components of their own.
+        order = instruments[:]
+        rng.shuffle(order)
+        stations = order[: count // 10]
+        parts = order[count // 10 :]
+        links = set()
+        for station in stations:
+            for part in rng.sample(parts, min(len(parts), rng.randint(2, 5))):
+                links.add((station.pk, part.pk))
+                child = rng.choice(parts)
+                if rng.random() < 0.2 and child != part:
+                    links.add((part.pk, child.pk))
+        Instrument.components.through._default_manager.bulk_create(
+            Instrument.components.through(
+                from_instrument_id=parent, to_instrument_id=child
+            )
+            for parent, child in links
+        )
+
+        versioned: list[Instrument] = []
+        candidates = order[count // 2 :]
+        while len(candidates) >= 4 and len(versioned) < count // 10:
+            chain = [candidates.pop() for _ in range(rng.randint(2, 4))]
+            for old, new in zip(chain, chain[1:]):
+                old.new_version = new
+                versioned.append(old)
+        Instrument.objects.bulk_update(versioned, ["new_version"])
+
+        author, _ = User.objects.get_or_create(username="synthetic")
+        LogEntry.objects.bulk_create(
+            LogEntry(
+                instrument=instrument,
+                author=author,
+                content=f"Synthetic log entry {j} of {instrument.name}.",
+                date=START_DATE + datetime.timedelta(days=rng.randint(0, 9000)),
+            )
+            for instrument in instruments
+            for j in range(rng.randint(0, 5))
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {len(instruments)} instruments with "
+                f"{len(campaigns)} campaigns, {len(contacts)} contacts, "
+                f"{len(links)} component links and {len(versioned)} version links"
+            )
+        )
+        return instruments
+
+    def _periods(self, count: int) -> list[tuple[datetime.date, datetime.date | None]]:
+        """Consecutive date ranges, the last one still open."""
+        periods: list[tuple[datetime.date, datetime.date | None]] = []
+        start = START_DATE + datetime.timedelta(days=self.rng.randint(0, 3000))
+        for i in range(count):
+            if i == count - 1:
+                periods.append((start, None))
+                break
+            end = start + datetime.timedelta(days=self.rng.randint(30, 1000))
+            periods.append((start, end))
+            start = end
+        return periods
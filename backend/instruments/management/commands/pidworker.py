@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from instruments import httpclient
+from instruments.models import PidJob
+
+
+class Command(BaseCommand):
+    help = "Processes queued PID jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when no jobs are due."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Maximum number of jobs processed together.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait when no jobs are due.",
+        )
+        parser.add_argument(
+            "--stats-interval",
+            type=float,
+            default=3600,
+            help="Seconds between reports of requests to the PID service.",
+        )
+
+    def _report(self):
+        for line in httpclient.summary():
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        reported_at = time.monotonic()
+        while True:
+            if time.monotonic() - reported_at >= options["stats_interval"]:
+                self._report()
+                reported_at = time.monotonic()
+            jobs = PidJob.claim(limit=options["batch_size"])
+            if not jobs:
+                if options["once"]:
+                    self._report()
+                    break
+                time.sleep(options["interval"])
+                continue
+            PidJob.run_batch(jobs)
+            for job in jobs:
+                if job.status == PidJob.DONE:
+                    self.stdout.write(self.style.SUCCESS(f"Processed {job.instrument}"))
+                elif job.last_error:
+                    self.stderr.write(
+                        f"Failed to process {job.instrument} "
+                        f"(attempt {job.attempts}): {job.last_error}"
+                    )
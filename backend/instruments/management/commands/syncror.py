@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from instruments import httpclient, ror, signals
+from instruments.models import Instrument, Organization, RorRecord
+
+
+class Command(BaseCommand):
+    help = "Updates names and acronyms of organizations from ROR"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dump",
+            type=Path,
+            help="Read records from a local ROR data dump (zip) instead of the "
+            "ROR API.",
+        )
+        parser.add_argument(
+            "--index",
+            action="store_true",
+            help="Also rebuild the local search index from the dump.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of concurrent requests to the ROR API.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=5,
+            help="Maximum number of requests per second to the ROR API.",
+        )
+
+    def _index(self, records):
+        with transaction.atomic():
+            RorRecord.objects.all().delete()
+            created = RorRecord.objects.bulk_create(
+                (RorRecord.from_record(record) for record in records), batch_size=2000
+            )
+        self.stdout.write(self.style.SUCCESS(f"Indexed {len(created)} ROR records"))
+
+    def handle(self, *args, **options):
+        if options["index"] and not options["dump"]:
+            raise CommandError("--index requires --dump")
+        organizations = list(
+            Organization.objects.exclude(ror_id__isnull=True).exclude(ror_id="")
+        )
+        if options["dump"]:
+            records = ror.load_dump(options["dump"])
+            if options["index"]:
+                self._index(records.values())
+            results = [
+                (records.get(org.ror_id), "not found in dump") for org in organizations
+            ]
+        else:
+            limiter = ror.RateLimiter(options["rate"])
+
+            def fetch(ror_id: str):
+                limiter.wait()
+                try:
+                    return ror.fetch(ror_id), None
+                except Exception as err:
+                    return None, str(err)
+
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                results = list(
+                    executor.map(fetch, (org.ror_id for org in organizations))
+                )
+            for line in httpclient.summary():
+                self.stdout.write(line)
+
+        changed = []
+        failed = 0
+        for organization, (record, error) in zip(organizations, results):
+            if record is None:
+                self.stderr.write(f"Failed to update {organization}: {error}")
+                failed += 1
+                continue
+            before = (organization.name, organization.acronym)
+            organization.update_from_ror(record)
+            if (organization.name, organization.acronym) != before:
+                changed.append(organization)
+                self.stdout.write(self.style.SUCCESS(f"Updated {organization}"))
+
+        Organization.objects.bulk_update(changed, ["name", "acronym"])
+        signals.bulk_changed(
+            Instrument.objects.filter(
+                Q(owners__in=changed)
+                | Q(manufacturers__in=changed)
+                | Q(model__manufacturers__in=changed)
+            )
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {len(organizations)} organizations: {len(changed)} updated, "
+                f"{failed} failed"
+            )
+        )
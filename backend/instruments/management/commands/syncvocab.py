@@ -1,80 +1,174 @@
-from functools import lru_cache
+from pathlib import Path
 
-import requests
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.db.models import Q
 
-from instruments.models import Model, Type
+from instruments import signals
+from instruments.models import Instrument, Model, Type
+from instruments.vocab import (
+    ConceptFetcher,
+    ConceptNotFound,
+    OfflineVocabulary,
+    OnlineVocabulary,
+    Vocabulary,
+)
+
+INSTRUMENT_TYPE_URL = "https://vocabulary.actris.nilu.no/actris_vocab/instrumenttype"
 
 
 class Command(BaseCommand):
     help = "Synchronizes models with vocabulary"
 
-    def _iterate_concepts(self, value):
-        if isinstance(value, list):
-            return value
-        return [value]
-
-    @lru_cache
-    def _fetch_graph(self, concept_url: str):
-        response = requests.get(concept_url, headers={"accept": "application/json"})
-        response.raise_for_status()
-        return response.json()["graph"]
-
-    def _does_descend_from(
-        self, concept_url: str, ancestor_url: str, max_depth: int = 10
-    ):
-        if concept_url == ancestor_url:
-            return True
-        if max_depth == 0:
-            return False
-        graph = self._fetch_graph(concept_url)
-        current_concept = next(item for item in graph if item["uri"] == concept_url)
-        if "broader" not in current_concept:
-            return False
-        broader_concept_urls = [
-            item["uri"] for item in self._iterate_concepts(current_concept["broader"])
-        ]
-        broader_concepts = [
-            item for item in graph if item["uri"] in broader_concept_urls
-        ]
-        for concept in broader_concepts:
-            if self._does_descend_from(concept["uri"], ancestor_url, max_depth - 1):
-                return True
-        return False
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dump",
+            type=Path,
+            help="Read concepts from a local SKOS dump in JSON-LD instead of "
+            "the vocabulary server.",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            type=Path,
+            default=settings.VOCABULARY_CACHE_DIR,
+            help="Directory for cached concepts.",
+        )
+        parser.add_argument(
+            "--max-age",
+            type=float,
+            default=0,
+            help="Use cached concepts younger than this many seconds without "
+            "asking the vocabulary server.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of concurrent requests to the vocabulary server.",
+        )
 
     def handle(self, *args, **options):
-        count = 0
-        for model in Model.objects.filter(concept_url__isnull=False):
+        vocabulary: Vocabulary
+        if options["dump"]:
+            vocabulary = OfflineVocabulary.load(options["dump"])
+        else:
+            vocabulary = OnlineVocabulary(
+                ConceptFetcher(
+                    cache_dir=options["cache_dir"],
+                    max_age=options["max_age"],
+                    workers=options["workers"],
+                )
+            )
+        models = list(Model.objects.filter(concept_url__isnull=False))
+        vocabulary.prefetch(
+            [model.concept_url for model in models if model.concept_url],
+            INSTRUMENT_TYPE_URL,
+        )
+
+        desired: dict[int, set[str]] = {}
+        names: dict[str, str] = {}
+        for model in models:
             assert model.concept_url is not None
-            graph = self._fetch_graph(model.concept_url)
-            model_concept = next(
-                item for item in graph if item["uri"] == model.concept_url
+            try:
+                urls = {
+                    url
+                    for url in vocabulary.broader(model.concept_url)
+                    if vocabulary.descends_from(url, INSTRUMENT_TYPE_URL)
+                }
+                labels = {url: vocabulary.label(url) for url in urls}
+            except ConceptNotFound as err:
+                self.stderr.write(f"Skipped {model.name}: concept {err} not found")
+                continue
+            desired[model.pk] = urls
+            names.update(labels)
+
+        with transaction.atomic():
+            self._apply(
+                {model.pk: model for model in models if model.pk in desired},
+                desired,
+                names,
             )
-            type_concept_urls = [
-                item["uri"]
-                for item in self._iterate_concepts(model_concept["broader"])
-                if self._does_descend_from(
-                    item["uri"],
-                    "https://vocabulary.actris.nilu.no/actris_vocab/instrumenttype",
-                )
-            ]
-            type_concepts = [item for item in graph if item["uri"] in type_concept_urls]
 
-            model.types.clear()
-            for type_concept in type_concepts:
-                url = type_concept["uri"]
-                name = type_concept["prefLabel"]["value"]
-                type_obj, created = Type.objects.filter(
-                    Q(concept_url=url) | Q(name=name)
-                ).get_or_create()
+    def _apply(
+        self,
+        models: dict[int, Model],
+        desired: dict[int, set[str]],
+        names: dict[str, str],
+    ):
+        types_by_url = {}
+        types_by_name = {}
+        for existing in Type.objects.filter(
+            Q(concept_url__in=names) | Q(name__in=names.values())
+        ):
+            types_by_url[existing.concept_url] = existing
+            types_by_name[existing.name] = existing
+
+        created: list[Type] = []
+        updated: list[Type] = []
+        resolved: dict[str, Type] = {}
+        for url, name in names.items():
+            type_obj: Type | None = types_by_url.get(url) or types_by_name.get(name)
+            if type_obj is None:
+                type_obj = Type(concept_url=url, name=name)
+                created.append(type_obj)
+            elif (type_obj.concept_url, type_obj.name) != (url, name):
                 type_obj.concept_url = url
                 type_obj.name = name
-                type_obj.save()
-                if created:
-                    self.stdout.write(
-                        self.style.SUCCESS(f"Created type {type_obj.name}")
-                    )
-                model.types.add(type_obj)
-            count += 1
-        self.stdout.write(self.style.SUCCESS(f"Synchronized {count} models"))
+                updated.append(type_obj)
+            resolved[url] = type_obj
+        Type.objects.bulk_create(created)
+        Type.objects.bulk_update(updated, ["concept_url", "name"])
+        for type_obj in created:
+            self.stdout.write(self.style.SUCCESS(f"Created type {type_obj.name}"))
+        for type_obj in updated:
+            self.stdout.write(self.style.SUCCESS(f"Updated type {type_obj.name}"))
+
+        through = Model.types.through
+        current = {
+            (model_id, type_id): pk
+            for pk, model_id, type_id in through._default_manager.filter(
+                model_id__in=desired
+            ).values_list("pk", "model_id", "type_id")
+        }
+        wanted = {
+            (model_id, resolved[url].pk)
+            for model_id, urls in desired.items()
+            for url in urls
+        }
+        added = sorted(wanted - current.keys())
+        removed = sorted(current.keys() - wanted)
+        through._default_manager.filter(
+            pk__in=[current[link] for link in removed]
+        ).delete()
+        through._default_manager.bulk_create(
+            [through(model_id=model_id, type_id=type_id) for model_id, type_id in added]
+        )
+        type_names = dict(
+            Type.objects.filter(
+                pk__in={type_id for _, type_id in added + removed}
+            ).values_list("pk", "name")
+        )
+        for model_id, type_id in added:
+            self.stdout.write(
+                f"Added type {type_names[type_id]} to {models[model_id].name}"
+            )
+        for model_id, type_id in removed:
+            self.stdout.write(
+                f"Removed type {type_names[type_id]} from {models[model_id].name}"
+            )
+
+        signals.bulk_changed(
+            Instrument.objects.filter(
+                Q(model_id__in={model_id for model_id, _ in added + removed})
+                | Q(types__in=updated)
+                | Q(model__types__in=updated)
+            )
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synchronized {len(models)} models: {len(created)} types created, "
+                f"{len(updated)} updated, {len(added)} links added, "
+                f"{len(removed)} removed"
+            )
+        )
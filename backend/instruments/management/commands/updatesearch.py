@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from instruments import search
+from instruments.models import Instrument
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the search vectors of all instruments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only build vectors of instruments that have none, e.g. after "
+            "upgrading from a version without search.",
+        )
+
+    def handle(self, *args, **options):
+        instruments = Instrument.objects.all()
+        if options["missing"]:
+            instruments = instruments.filter(search_vector__isnull=True)
+        count = instruments.update(search_vector=search.vector())
+        self.stdout.write(self.style.SUCCESS(f"Updated {count} instruments"))
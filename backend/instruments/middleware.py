@@ -0,0 +1,76 @@
+"""Timing of database queries and outbound HTTP requests per request.
+
+Work done while a streaming response is consumed is not included.
+"""
+
+import logging
+import time
+
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+
+from . import httpclient
+
+logger = logging.getLogger(__name__)
+
+
+class _QueryTimer:
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class ServerTimingMiddleware:
+    """Report query and outbound HTTP timings in a Server-Timing header.
+
+    The same numbers are logged with the name of the resolved view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        queries = _QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries), httpclient.track() as http:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        http_seconds = sum(http)
+        response.headers["Server-Timing"] = ", ".join(
+            [
+                f'sql;dur={queries.seconds * 1000:.1f};desc="SQL queries: {queries.count}"',
+                f'http;dur={http_seconds * 1000:.1f};desc="HTTP requests: {len(http)}"',
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+        match = request.resolver_match
+        view = match.view_name if match else None
+        logger.info(
+            "view=%s method=%s status=%d sql_queries=%d sql_ms=%.1f "
+            "http_requests=%d http_ms=%.1f total_ms=%.1f",
+            view,
+            request.method,
+            response.status_code,
+            queries.count,
+            queries.seconds * 1000,
+            len(http),
+            http_seconds * 1000,
+            total * 1000,
+            extra={
+                "view": view,
+                "sql_queries": queries.count,
+                "sql_seconds": queries.seconds,
+                "http_requests": len(http),
+                "http_seconds": http_seconds,
+                "total_seconds": total,
+            },
+        )
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0040_contact_role"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="instrument",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0041_instrument_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PidJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "register",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Create or update PID of the instrument.",
+                    ),
+                ),
+                (
+                    "propagate",
+                    models.BooleanField(
+                        default=True, help_text="Update PIDs of related instruments."
+                    ),
+                ),
+                (
+                    "status",
+                    models.TextField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "instrument",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pid_jobs",
+                        to="instruments.instrument",
+                    ),
+                ),
+            ],
+        ),
+    ]
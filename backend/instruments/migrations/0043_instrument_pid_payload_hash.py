@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0042_pidjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="instrument",
+            name="pid_payload_hash",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, null=True
+            ),
+        ),
+    ]
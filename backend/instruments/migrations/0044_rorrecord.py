@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0043_instrument_pid_payload_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RorRecord",
+            fields=[
+                (
+                    "ror_id",
+                    models.CharField(max_length=9, primary_key=True, serialize=False),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("acronym", models.CharField(blank=True, max_length=255, null=True)),
+                ("search_text", models.TextField()),
+            ],
+        ),
+    ]
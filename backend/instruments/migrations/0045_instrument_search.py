@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0044_rorrecord"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="instrument",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="instrument",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="instrument_search_vector"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="instrument",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["serial_number"],
+                name="instrument_serial_number_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
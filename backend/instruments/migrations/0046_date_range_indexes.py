@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:27
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0045_instrument_search"),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddIndex(
+            model_name="campaign",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["date_range", "location"], name="campaign_date_range_location"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contact",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["date_range", "instrument"],
+                name="contact_date_range_instrument",
+            ),
+        ),
+    ]
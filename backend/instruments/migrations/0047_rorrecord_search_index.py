@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:50
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0046_date_range_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rorrecord",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_text"],
+                name="rorrecord_search_text_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-18 21:03
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("instruments", "0047_rorrecord_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="instrument",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("serial_number"),
+                    name="gin_trgm_ops",
+                ),
+                name="instrument_serial_upper_trgm",
+            ),
+        ),
+    ]
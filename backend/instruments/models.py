@@ -1,17 +1,24 @@
 import datetime
+import hashlib
 import json
 import uuid
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, NamedTuple, Optional
 
-import requests
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import DateRangeField
-from django.db import models
-from django.db.models import QuerySet
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import Exists, F, Func, OuterRef, Prefetch, Q, QuerySet, Subquery
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
 from django.urls import reverse
+from django.utils import timezone
 from sorl.thumbnail import ImageField
 
+from . import httpclient, ror
 from .fields import OrcidIdField, RorIdField
 
 
@@ -54,15 +61,14 @@ class Organization(models.Model):
             }
         return {prefix: obj}
 
-    def update_from_ror(self):
+    def update_from_ror(self, record: Optional[dict] = None):
         if not self.ror_id:
             return
-        res = requests.get(f"https://api.ror.org/organizations/{self.ror_id}")
-        res.raise_for_status()
-        data = res.json()
-        self.name = data["name"]
-        if data["acronyms"]:
-            self.acronym = data["acronyms"][0]
+        if record is None:
+            record = ror.fetch(self.ror_id)
+        self.name, acronym = ror.parse(record)
+        if acronym:
+            self.acronym = acronym
 
     def __str__(self) -> str:
         result = self.name
@@ -71,6 +77,42 @@ class Organization(models.Model):
         return result
 
 
+class RorRecord(models.Model):
+    """Organization from a ROR data dump, searched by the admin autocomplete."""
+
+    class Meta:
+        indexes = [
+            # Speeds up substring matching with LIKE.
+            GinIndex(
+                fields=["search_text"],
+                name="rorrecord_search_text_trgm",
+                opclasses=["gin_trgm_ops"],
+            )
+        ]
+
+    ror_id = models.CharField(max_length=9, primary_key=True)
+    name = models.CharField(max_length=255)
+    acronym = models.CharField(max_length=255, null=True, blank=True)
+    search_text = models.TextField()
+
+    @classmethod
+    def from_record(cls, record: dict) -> "RorRecord":
+        name, acronym = ror.parse(record)
+        return cls(
+            ror_id=ror.record_id(record),
+            name=name,
+            acronym=acronym,
+            search_text="\n".join(ror.names(record)).lower(),
+        )
+
+    def summary(self) -> dict:
+        return {
+            "id": f"https://ror.org/{self.ror_id}",
+            "name": self.name,
+            "acronyms": [self.acronym] if self.acronym else [],
+        }
+
+
 class Model(models.Model):
     name = models.CharField(max_length=255)
     manufacturers = models.ManyToManyField(Organization)
@@ -121,9 +163,108 @@ class Location(models.Model):
         return self.name
 
 
+class InstrumentQuerySet(models.QuerySet):
+    def with_pidinst(self) -> "InstrumentQuerySet":
+        """Prefetch everything needed by `Instrument.pidinst`."""
+        lookups = _pidinst_lookups(
+            campaigns="commissioned_on" not in self.query.annotations
+        )
+        return self.select_related("model").prefetch_related(*lookups)
+
+    def related_to(self, instrument_ids: Iterable[int]) -> "InstrumentQuerySet":
+        """Filter instruments whose PIDINST documents refer to given instruments."""
+        ids = list(instrument_ids)
+        return self.filter(
+            Q(components__in=ids)
+            | Q(component_of__in=ids)
+            | Q(new_version__in=ids)
+            | Q(instrument__in=ids)
+        ).distinct()
+
+    def with_service_dates(self) -> "InstrumentQuerySet":
+        """Annotate `commissioned_on` and `decommissioned_on`.
+
+        These are the start of the first campaign and the end of the last one,
+        which `Instrument.commission_date` and `Instrument.decommission_date`
+        return without further queries when annotated.
+        """
+        campaigns = Campaign.objects.filter(instrument=OuterRef("pk"))
+        return self.annotate(
+            commissioned_on=Subquery(
+                campaigns.order_by("date_range").values(
+                    start=Func("date_range", function="lower")
+                )[:1],
+                output_field=models.DateField(),
+            ),
+            decommissioned_on=Subquery(
+                campaigns.order_by("-date_range").values(
+                    end=Func("date_range", function="upper")
+                )[:1],
+                output_field=models.DateField(),
+            ),
+        )
+
+    def deployed(
+        self, date: Optional[datetime.date] = None, location: Optional[str] = None
+    ) -> "InstrumentQuerySet":
+        """Filter instruments with a campaign on `date` at `location`."""
+        campaigns = Campaign.objects.filter(instrument=OuterRef("pk"))
+        if date is not None:
+            campaigns = campaigns.filter(date_range__contains=date)
+        if location is not None:
+            campaigns = campaigns.filter(location__name=location)
+        return self.filter(Exists(campaigns))
+
+    def of_type(self, name: str) -> "InstrumentQuerySet":
+        """Filter instruments by name of type, like `Instrument.get_types`."""
+        return self.filter(
+            Q(Exists(Type.objects.filter(instrument=OuterRef("pk"), name=name)))
+            & Q(model__isnull=True)
+            | Q(Exists(Type.objects.filter(model=OuterRef("model_id"), name=name)))
+            & Q(model__isnull=False)
+        )
+
+    def with_pi(self, orcid_id: str) -> "InstrumentQuerySet":
+        return self.filter(
+            Exists(
+                Contact.objects.filter(
+                    instrument=OuterRef("pk"),
+                    role=Contact.PI,
+                    person__orcid_id=orcid_id,
+                )
+            )
+        )
+
+
 class Instrument(models.Model):
     class Meta:
         permissions = [("can_create_pid", "Can create PID")]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="instrument_search_vector"),
+            GinIndex(
+                fields=["serial_number"],
+                name="instrument_serial_number_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            # PostgreSQL compiles `icontains` to UPPER(...) LIKE, which only this
+            # index can serve. Used by instruments.search.
+            GinIndex(
+                OpClass(Upper("serial_number"), name="gin_trgm_ops"),
+                name="instrument_serial_upper_trgm",
+            ),
+        ]
+
+    objects = InstrumentQuerySet.as_manager()
+
+    # Set by `InstrumentQuerySet.with_pidinst`.
+    chronological_campaigns: list["Campaign"]
+    # Set by `InstrumentQuerySet.with_service_dates`.
+    commissioned_on: Optional[datetime.date]
+    decommissioned_on: Optional[datetime.date]
+    # Set by `Instrument.versions`.
+    version_offset: int
+    # Set by the landing page view.
+    pi_contacts: list["Contact"]
 
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     pid = models.URLField(unique=True, null=True, verbose_name="PID")
@@ -160,6 +301,14 @@ class Instrument(models.Model):
     new_version = models.ForeignKey(
         "self", null=True, blank=True, on_delete=models.PROTECT
     )
+    # Also updated when related rows change, see instruments.signals.
+    updated_at = models.DateTimeField(auto_now=True)
+    # SHA-256 of the payload last sent to the PID service.
+    pid_payload_hash = models.CharField(
+        max_length=64, null=True, blank=True, editable=False
+    )
+    # Maintained by instruments.search.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def pidinst(self):
         result: dict = {
@@ -231,7 +380,7 @@ class Instrument(models.Model):
             ]
         return result
 
-    def create_or_update_pid(self):
+    def pid_payload(self) -> dict:
         types = {
             "Identifier": "21.T11148/8eb858ee0b12e8e463a5",
             "SchemaVersion": "21.T11148/f5e68cc7718a6af2a96c",
@@ -247,7 +396,7 @@ class Instrument(models.Model):
             "AlternateIdentifiers": "21.T11148/eb3c713572f681e6c4c3",
             "RelatedIdentifiers": "21.T11148/178fb558abc755ca7046",
         }
-        payload = {
+        return {
             "type": "instrument",
             "uuid": str(self.uuid),
             "url": self.landing_page,
@@ -256,21 +405,15 @@ class Instrument(models.Model):
                 for key, value in self.pidinst().items()
             ],
         }
-        res = requests.post(settings.PID_SERVICE_URL, json=payload)
-        res.raise_for_status()
-        pid = res.json()["pid"]
-        self.pid = pid
-        self.save()
-
-    def update_related_pids(self):
-        for component in self.components.filter(pid__isnull=False):
-            component.create_or_update_pid()
-        for parent in self.parents.filter(pid__isnull=False):
-            parent.create_or_update_pid()
-        if self.new_version and self.new_version.pid:
-            self.new_version.create_or_update_pid()
-        if self.previous_version and self.previous_version.pid:
-            self.previous_version.create_or_update_pid()
+
+    def create_or_update_pid(self):
+        payload = self.pid_payload()
+        payload_hash = _payload_hash(payload)
+        if self.pid and self.pid_payload_hash == payload_hash:
+            return
+        self.pid = _register_payload(payload)
+        self.pid_payload_hash = payload_hash
+        self.save(update_fields=PID_FIELDS)
 
     @property
     def landing_page(self) -> str:
@@ -289,24 +432,126 @@ class Instrument(models.Model):
 
     @property
     def commission_date(self) -> Optional[datetime.date]:
-        obj = self.campaign_set.order_by("date_range").first()
+        if hasattr(self, "commissioned_on"):
+            return self.commissioned_on
+        if hasattr(self, "chronological_campaigns"):
+            campaigns = self.chronological_campaigns
+            obj = campaigns[0] if campaigns else None
+        else:
+            obj = self.campaign_set.order_by("date_range").first()
         return obj.date_range.lower if obj else None
 
     @property
     def decommission_date(self) -> Optional[datetime.date]:
-        obj = self.campaign_set.order_by("date_range").last()
+        if hasattr(self, "decommissioned_on"):
+            return self.decommissioned_on
+        if hasattr(self, "chronological_campaigns"):
+            campaigns = self.chronological_campaigns
+            obj = campaigns[-1] if campaigns else None
+        else:
+            obj = self.campaign_set.order_by("date_range").last()
         return obj.date_range.upper if obj else None
 
     @property
     def parents(self):
-        return Instrument.objects.filter(components=self)
+        return self.component_of.all()
 
     @property
     def previous_version(self):
-        try:
-            return Instrument.objects.get(new_version=self)
-        except Instrument.DoesNotExist:
-            return None
+        return next(iter(self.instrument_set.all()), None)
+
+    def versions(self) -> list["Instrument"]:
+        """Return all versions of this instrument, oldest first, in one query.
+
+        The `new_version` links are followed in both directions. Each version
+        gets `version_offset`, its distance from this instrument.
+        """
+        table = Instrument._meta.db_table
+        return list(
+            Instrument.objects.raw(
+                f"""
+                WITH RECURSIVE older(id, version_offset, path) AS (
+                    SELECT id, 0, ARRAY[id] FROM {table} WHERE id = %s
+                  UNION ALL
+                    SELECT i.id, o.version_offset - 1, o.path || i.id
+                    FROM {table} i JOIN older o ON i.new_version_id = o.id
+                    WHERE NOT i.id = ANY(o.path)
+                ), newer(id, new_version_id, version_offset, path) AS (
+                    SELECT id, new_version_id, 0, ARRAY[id] FROM {table} WHERE id = %s
+                  UNION ALL
+                    SELECT i.id, i.new_version_id, n.version_offset + 1, n.path || i.id
+                    FROM {table} i JOIN newer n ON i.id = n.new_version_id
+                    WHERE NOT i.id = ANY(n.path)
+                ), chain(id, version_offset) AS (
+                    SELECT id, version_offset FROM older
+                  UNION
+                    SELECT id, version_offset FROM newer
+                )
+                SELECT {table}.*, chain.version_offset
+                FROM chain JOIN {table} USING (id)
+                ORDER BY chain.version_offset, {table}.id
+                """,
+                [self.pk, self.pk],
+            )
+        )
+
+    def assembly(self) -> list["AssemblyNode"]:
+        """Return the assembly trees that contain this instrument.
+
+        The containing systems are followed up to the top-level ones, whose
+        components are then expanded to all levels. The links are found with
+        one recursive query and the instruments with their types are fetched
+        with prefetches.
+        """
+        table = Instrument.components.through._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE up(id, path) AS (
+                    SELECT %s::bigint, ARRAY[%s::bigint]
+                  UNION ALL
+                    SELECT c.from_instrument_id, up.path || c.from_instrument_id
+                    FROM {table} c JOIN up ON c.to_instrument_id = up.id
+                    WHERE NOT c.from_instrument_id = ANY(up.path)
+                ), roots(id) AS (
+                    SELECT id FROM up WHERE NOT EXISTS (
+                        SELECT 1 FROM {table} c WHERE c.to_instrument_id = up.id
+                    )
+                ), down(parent_id, id, path) AS (
+                    SELECT NULL::bigint, id, ARRAY[id] FROM roots
+                  UNION ALL
+                    SELECT c.from_instrument_id, c.to_instrument_id,
+                        down.path || c.to_instrument_id
+                    FROM {table} c JOIN down ON c.from_instrument_id = down.id
+                    WHERE NOT c.to_instrument_id = ANY(down.path)
+                )
+                SELECT DISTINCT parent_id, id FROM down
+                """,
+                [self.pk, self.pk],
+            )
+            links = cursor.fetchall()
+        if not links:
+            # The instrument is part of a cycle without a top-level system.
+            links = [(None, self.pk)]
+        instruments = Instrument.objects.select_related("model").prefetch_related(
+            "types", "model__types"
+        )
+        by_id = instruments.in_bulk({pk for _, pk in links})
+        children: dict[Optional[int], list[int]] = {}
+        for parent_id, pk in sorted(links, key=lambda link: link[1]):
+            children.setdefault(parent_id, []).append(pk)
+
+        def node(pk: int, path: tuple[int, ...]) -> AssemblyNode:
+            return AssemblyNode(
+                by_id[pk],
+                [
+                    node(child, path + (child,))
+                    for child in children.get(pk, [])
+                    if child not in path
+                ],
+            )
+
+        return [node(pk, (pk,)) for pk in children[None]]
 
     def get_manufacturers(self):
         if self.model:
@@ -373,7 +618,19 @@ class Instrument(models.Model):
         return self.name
 
 
+class AssemblyNode(NamedTuple):
+    instrument: Instrument
+    components: list["AssemblyNode"]
+
+
 class Campaign(models.Model):
+    class Meta:
+        indexes = [
+            GistIndex(
+                fields=["date_range", "location"], name="campaign_date_range_location"
+            )
+        ]
+
     location = models.ForeignKey(Location, on_delete=models.PROTECT)
     instrument = models.ForeignKey(Instrument, on_delete=models.PROTECT)
     date_range = DateRangeField(blank=True)
@@ -390,7 +647,46 @@ class Campaign(models.Model):
         return f"{name} {date_range}"
 
 
+class ContactQuerySet(models.QuerySet):
+    def pis_on(
+        self, queries: list[tuple[str, Optional[datetime.date]]]
+    ) -> "ContactQuerySet":
+        """Filter PIs of many instruments on given dates in one range join.
+
+        `queries` are pairs of instrument UUID and date, where a date of None
+        matches any date. The UUID of the instrument is annotated as
+        `instrument_uuid`.
+        """
+        contact = Contact._meta.db_table
+        instrument = Instrument._meta.db_table
+        matches = RawSQL(
+            f"""EXISTS (
+                SELECT 1 FROM unnest(%s::uuid[], %s::date[]) AS q(uuid, date)
+                JOIN {instrument} AS i ON i.uuid = q.uuid
+                WHERE i.id = {contact}.instrument_id
+                AND (q.date IS NULL OR {contact}.date_range @> q.date)
+            )""",
+            ([uuid_ for uuid_, _ in queries], [date for _, date in queries]),
+            output_field=models.BooleanField(),
+        )
+        return (
+            self.filter(matches, role=Contact.PI)
+            .annotate(instrument_uuid=F("instrument__uuid"))
+            .order_by("-date_range")
+        )
+
+
 class Contact(models.Model):
+    class Meta:
+        indexes = [
+            GistIndex(
+                fields=["date_range", "instrument"],
+                name="contact_date_range_instrument",
+            )
+        ]
+
+    objects = ContactQuerySet.as_manager()
+
     person = models.ForeignKey(Person, on_delete=models.PROTECT)
     instrument = models.ForeignKey(Instrument, on_delete=models.PROTECT)
     date_range = DateRangeField(blank=True)
@@ -445,3 +741,246 @@ class RelatedIdentifier(models.Model):
     identifier = models.CharField(max_length=255)
     identifier_type = models.CharField(max_length=7, choices=IDENTIFIER_TYPE_CHOICES)
     relation_type = models.CharField(max_length=19, choices=RELATION_TYPE_CHOICES)
+
+
+class PidJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    MAX_ATTEMPTS = 6
+    # Running jobs not updated within this time are assumed to be abandoned.
+    # `run_batch` touches its jobs whenever a registration completes.
+    STALE_AFTER = datetime.timedelta(minutes=10)
+
+    instrument = models.ForeignKey(
+        Instrument, on_delete=models.CASCADE, related_name="pid_jobs"
+    )
+    register = models.BooleanField(
+        default=True, help_text="Create or update PID of the instrument."
+    )
+    propagate = models.BooleanField(
+        default=True, help_text="Update PIDs of related instruments."
+    )
+    status = models.TextField(choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def enqueue(
+        cls, instrument: Instrument, register: bool = True, propagate: bool = True
+    ) -> "PidJob":
+        """Queue PID update, merging it with a pending job of the instrument."""
+        job = cls.objects.filter(instrument=instrument, status=cls.PENDING).first()
+        if job is None:
+            return cls.objects.create(
+                instrument=instrument, register=register, propagate=propagate
+            )
+        job.register |= register
+        job.propagate |= propagate
+        job.save()
+        return job
+
+    @classmethod
+    def claim(cls, limit: int = 100) -> "list[PidJob]":
+        """Mark due jobs as running and return them."""
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=cls.PENDING, run_after__lte=now)
+                    | Q(status=cls.RUNNING, updated_at__lt=now - cls.STALE_AFTER)
+                )
+                .select_related("instrument")
+                .order_by("run_after", "pk")[:limit]
+            )
+            for job in jobs:
+                job.status = cls.RUNNING
+                job.save()
+        return jobs
+
+    @classmethod
+    def run_batch(cls, jobs: "list[PidJob]") -> None:
+        """Run jobs together so that every instrument is registered only once.
+
+        If registrations fail, the failure is charged to the jobs of the failed
+        instruments, or to every job if only related instruments failed. The
+        remaining jobs are queued again right away.
+        """
+        job_ids = [job.pk for job in jobs]
+
+        def heartbeat() -> None:
+            cls.objects.filter(pk__in=job_ids).update(updated_at=timezone.now())
+
+        failures = update_pids(
+            register=[job.instrument for job in jobs if job.register],
+            propagate=[job.instrument for job in jobs if job.propagate],
+            heartbeat=heartbeat,
+        )
+        failed_jobs = [job for job in jobs if job.instrument_id in failures]
+        if failures and not failed_jobs:
+            failed_jobs = jobs
+        error = next(iter(failures.values()), None)
+        for job in jobs:
+            if job in failed_jobs:
+                job.attempts += 1
+                job.last_error = str(failures.get(job.instrument_id, error))
+                if job.attempts >= cls.MAX_ATTEMPTS:
+                    job.status = cls.FAILED
+                else:
+                    job.status = cls.PENDING
+                    delay = datetime.timedelta(seconds=30 * 2 ** (job.attempts - 1))
+                    job.run_after = timezone.now() + delay
+            elif failures:
+                job.status = cls.PENDING
+            else:
+                job.status = cls.DONE
+                job.last_error = ""
+            job.save()
+
+    def __str__(self) -> str:
+        return f"{self.instrument} ({self.get_status_display()})"
+
+
+def _pidinst_lookups(campaigns: bool) -> list[Prefetch]:
+    """Lookups for `Instrument.pidinst`.
+
+    Campaigns are only needed for the service dates, so they can be skipped
+    when the instruments come from `InstrumentQuerySet.with_service_dates`.
+    """
+    related = Instrument.objects.only("uuid", "pid").order_by("pk")
+    organizations = Organization.objects.order_by("pk")
+    types = Type.objects.order_by("pk")
+    lookups = [
+        Prefetch("owners", queryset=organizations),
+        Prefetch("manufacturers", queryset=organizations),
+        Prefetch("types", queryset=types),
+        Prefetch("model__manufacturers", queryset=organizations),
+        Prefetch("model__types", queryset=types),
+        Prefetch("model__variables", queryset=Variable.objects.order_by("pk")),
+        Prefetch(
+            "related_identifiers", queryset=RelatedIdentifier.objects.order_by("pk")
+        ),
+        Prefetch("components", queryset=related),
+        Prefetch("component_of", queryset=related),
+        Prefetch("new_version", queryset=related),
+        Prefetch("instrument_set", queryset=related),
+    ]
+    if campaigns:
+        lookups.append(
+            Prefetch(
+                "campaign_set",
+                queryset=Campaign.objects.order_by("date_range"),
+                to_attr="chronological_campaigns",
+            )
+        )
+    return lookups
+
+
+def pidinst_many(instruments: InstrumentQuerySet) -> list[dict]:
+    """Serialize instruments to PIDINST using a fixed number of queries."""
+    return [instrument.pidinst() for instrument in instruments.with_pidinst()]
+
+
+def _payload_hash(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _register_payload(payload: dict) -> str:
+    res = httpclient.post(settings.PID_SERVICE_URL, json=payload)
+    res.raise_for_status()
+    return res.json()["pid"]
+
+
+PID_FIELDS = ["pid", "pid_payload_hash", "updated_at"]
+
+
+def _register_many(
+    instruments: InstrumentQuerySet, heartbeat: Callable[[], None] | None = None
+) -> dict[int, BaseException]:
+    """Register changed instruments concurrently and return failures by key.
+
+    `heartbeat` is called whenever a registration completes.
+    """
+    pending = []
+    for instrument in instruments.with_pidinst():
+        payload = instrument.pid_payload()
+        payload_hash = _payload_hash(payload)
+        if not instrument.pid or instrument.pid_payload_hash != payload_hash:
+            pending.append((instrument, payload, payload_hash))
+    if not pending:
+        return {}
+    failures: dict[int, BaseException] = {}
+    workers = min(settings.PID_SERVICE_CONCURRENCY, len(pending))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_register_payload, item[1]) for item in pending]
+        for _ in as_completed(futures):
+            if heartbeat is not None:
+                heartbeat()
+    for (instrument, _, payload_hash), future in zip(pending, futures):
+        if error := future.exception():
+            failures[instrument.pk] = error
+            continue
+        pid = future.result()
+        if instrument.pid != pid:
+            instrument.pid = pid
+            instrument.pid_payload_hash = payload_hash
+            # Other fields may have been edited during the request.
+            instrument.save(update_fields=PID_FIELDS)
+        else:
+            # The hash is not part of any document, so skip the signals.
+            Instrument.objects.filter(pk=instrument.pk).update(
+                pid_payload_hash=payload_hash
+            )
+    return failures
+
+
+def update_pids(
+    register: Iterable[Instrument],
+    propagate: Iterable[Instrument],
+    heartbeat: Callable[[], None] | None = None,
+) -> dict[int, BaseException]:
+    """Create or update PIDs and refresh the PIDs of related instruments.
+
+    Instruments in `register` are sent to the PID service first. Afterwards,
+    instruments with a PID that refer to any instrument in `propagate` are
+    updated once each. Failures are returned by primary key. `heartbeat` is
+    called whenever a registration completes.
+    """
+    register_ids = {instrument.pk for instrument in register}
+    propagate_ids = {instrument.pk for instrument in propagate}
+    minted_ids = set(
+        Instrument.objects.filter(pk__in=register_ids, pid__isnull=True).values_list(
+            "pk", flat=True
+        )
+    )
+    failures = _register_many(Instrument.objects.filter(pk__in=register_ids), heartbeat)
+    if not propagate_ids:
+        return failures
+    related_ids = set(
+        Instrument.objects.filter(pid__isnull=False)
+        .related_to(propagate_ids)
+        .values_list("pk", flat=True)
+    )
+    # Registered instruments need another update only if they refer to an
+    # instrument that just received its PID.
+    repeat_ids = set(
+        Instrument.objects.filter(pk__in=register_ids & related_ids)
+        .related_to(minted_ids - failures.keys())
+        .values_list("pk", flat=True)
+    )
+    related_ids = (related_ids - register_ids) | repeat_ids
+    failures.update(
+        _register_many(Instrument.objects.filter(pk__in=related_ids), heartbeat)
+    )
+    return failures
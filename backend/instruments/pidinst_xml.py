@@ -0,0 +1,153 @@
+"""XML serialization of PIDINST documents.
+
+The XML is written from the dictionaries returned by `Instrument.pidinst`
+with an incremental writer, so single documents and bulk exports share the
+same code and no database access is needed while writing.
+"""
+
+import io
+from typing import Iterable, Iterator
+from xml.sax.saxutils import XMLGenerator
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.buffer = io.StringIO()
+        self.xml = XMLGenerator(self.buffer, encoding="utf-8")
+
+    def element(self, name: str, text: str, attrs: dict[str, str] | None = None):
+        self.xml.startElement(name, attrs or {})
+        self.xml.characters(text)
+        self.xml.endElement(name)
+
+    def start(self, name: str) -> None:
+        self.xml.startElement(name, {})
+
+    def end(self, name: str) -> None:
+        self.xml.endElement(name)
+
+    def flush(self) -> bytes:
+        content = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return content
+
+
+def _organizations(writer: _Writer, items: list[dict], prefix: str) -> None:
+    writer.start(f"{prefix}s")
+    for item in items:
+        organization = item[prefix]
+        writer.start(prefix)
+        writer.element(f"{prefix}Name", organization[f"{prefix}Name"])
+        if identifier := organization.get(f"{prefix}Identifier"):
+            writer.element(
+                f"{prefix}Identifier",
+                identifier[f"{prefix}IdentifierValue"],
+                {f"{prefix}IdentifierType": identifier[f"{prefix}IdentifierType"]},
+            )
+        writer.end(prefix)
+    writer.end(f"{prefix}s")
+
+
+def _instrument(writer: _Writer, pidinst: dict) -> None:
+    writer.start("instrument")
+    if identifier := pidinst.get("Identifier"):
+        writer.element(
+            "identifier",
+            identifier["identifierValue"],
+            {"identifierType": identifier["identifierType"]},
+        )
+    writer.element("schemaVersion", pidinst["SchemaVersion"])
+    writer.element("landingPage", pidinst["LandingPage"])
+    writer.element("name", pidinst["Name"])
+    _organizations(writer, pidinst["Owners"], "owner")
+    _organizations(writer, pidinst["Manufacturers"], "manufacturer")
+    if model := pidinst.get("Model"):
+        writer.start("model")
+        writer.element("modelName", model["modelName"])
+        if identifier := model.get("modelIdentifier"):
+            writer.element(
+                "modelIdentifier",
+                identifier["modelIdentifierValue"],
+                {"modelIdentifierType": identifier["modelIdentifierType"]},
+            )
+        writer.end("model")
+    if types := pidinst.get("InstrumentType"):
+        writer.start("instrumentTypes")
+        for item in types:
+            instrument_type = item["instrumentType"]
+            writer.start("instrumentType")
+            writer.element("instrumentTypeName", instrument_type["instrumentTypeName"])
+            if identifier := instrument_type.get("instrumentTypeIdentifier"):
+                writer.element(
+                    "instrumentTypeIdentifier",
+                    identifier["instrumentTypeIdentifierValue"],
+                    {
+                        "instrumentTypeIdentifierType": identifier[
+                            "instrumentTypeIdentifierType"
+                        ]
+                    },
+                )
+            writer.end("instrumentType")
+        writer.end("instrumentTypes")
+    if variables := pidinst.get("MeasuredVariables"):
+        writer.start("measuredVariables")
+        for item in variables:
+            writer.element(
+                "measuredVariable", item["measuredVariable"]["variableMeasured"]
+            )
+        writer.end("measuredVariables")
+    if dates := pidinst.get("Dates"):
+        writer.start("dates")
+        for item in dates:
+            writer.element(
+                "date", item["date"]["date"], {"dateType": item["date"]["dateType"]}
+            )
+        writer.end("dates")
+    if description := pidinst.get("Description"):
+        writer.element("description", description)
+    if related_identifiers := pidinst.get("RelatedIdentifiers"):
+        writer.start("relatedIdentifiers")
+        for item in related_identifiers:
+            related = item["relatedIdentifier"]
+            writer.element(
+                "relatedIdentifier",
+                related["relatedIdentifierValue"],
+                {
+                    "relatedIdentifierType": related["relatedIdentifierType"],
+                    "relationType": related["relationType"],
+                },
+            )
+        writer.end("relatedIdentifiers")
+    if alternate_identifiers := pidinst.get("AlternateIdentifiers"):
+        writer.start("alternateIdentifiers")
+        for item in alternate_identifiers:
+            alternate = item["alternateIdentifier"]
+            writer.element(
+                "alternateIdentifier",
+                alternate["alternateIdentifierValue"],
+                {"alternateIdentifierType": alternate["alternateIdentifierType"]},
+            )
+        writer.end("alternateIdentifiers")
+    writer.end("instrument")
+
+
+def to_xml(pidinst: dict) -> bytes:
+    writer = _Writer()
+    writer.xml.startDocument()
+    _instrument(writer, pidinst)
+    writer.xml.endDocument()
+    return writer.flush()
+
+
+def iter_xml(pidinsts: Iterable[dict]) -> Iterator[bytes]:
+    """Write many documents inside an `instruments` element, in chunks."""
+    writer = _Writer()
+    writer.xml.startDocument()
+    writer.start("instruments")
+    for pidinst in pidinsts:
+        _instrument(writer, pidinst)
+        yield writer.flush()
+    writer.end("instruments")
+    writer.xml.endDocument()
+    yield writer.flush()
@@ -0,0 +1,68 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class PidServiceStub:
+    """Local stand-in for the PID service.
+
+    Responds to registrations like the real service and records the received
+    payloads. The first `failures` requests fail with status 500.
+
+    >>> import requests
+    >>> with PidServiceStub() as stub:
+    ...     res = requests.post(stub.url, json={"uuid": "8fd884df-6896-4bae-a72f-b6260b5b8744"})
+    ...     res.json()["pid"], len(stub.payloads)
+    ('https://hdl.handle.net/21.12132/3.8fd884df68964bae', 1)
+    """
+
+    prefix = "https://hdl.handle.net/21.12132/3."
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.payloads: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}/pid/"
+
+    def _respond(self, payload: dict) -> tuple[int, dict]:
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                return 500, {"error": "Stub failure"}
+            self.payloads.append(payload)
+        pid = self.prefix + payload["uuid"].replace("-", "")[:16]
+        return 200, {"pid": pid}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                status, body = stub._respond(json.loads(self.rfile.read(length)))
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "PidServiceStub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,95 @@
+"""Access to organization records of the Research Organization Registry.
+
+Records are fetched from the ROR API or read from a data dump, the zip file
+published at https://doi.org/10.5281/zenodo.6347574. Both schema versions 1
+and 2 of the records are understood.
+"""
+
+import functools
+import json
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+from . import httpclient
+
+API_URL = "https://api.ror.org/organizations"
+
+
+def record_id(record: dict) -> str:
+    return record["id"].rsplit("/", 1)[-1]
+
+
+def parse(record: dict) -> tuple[str, str | None]:
+    """Return the display name and the first acronym of a record."""
+    if "names" in record:
+        name = next(
+            item["value"] for item in record["names"] if "ror_display" in item["types"]
+        )
+        acronyms = [
+            item["value"] for item in record["names"] if "acronym" in item["types"]
+        ]
+    else:
+        name = record["name"]
+        acronyms = record["acronyms"]
+    return name, acronyms[0] if acronyms else None
+
+
+def names(record: dict) -> list[str]:
+    """Return all names, acronyms, aliases and labels of a record."""
+    if "names" in record:
+        return [item["value"] for item in record["names"]]
+    return [
+        record["name"],
+        *record["acronyms"],
+        *record["aliases"],
+        *(item["label"] for item in record["labels"]),
+    ]
+
+
+def summary(record: dict) -> dict:
+    """Return the fields used by the organization autocomplete."""
+    name, acronym = parse(record)
+    return {"id": record["id"], "name": name, "acronyms": [acronym] if acronym else []}
+
+
+def fetch(ror_id: str) -> dict:
+    res = httpclient.get(f"{API_URL}/{ror_id}")
+    res.raise_for_status()
+    return res.json()
+
+
+@functools.lru_cache(maxsize=1024)
+def search(query: str) -> tuple[dict, ...]:
+    """Search organizations from the ROR API. Results are cached per query."""
+    res = httpclient.get(API_URL, params={"query": query})
+    res.raise_for_status()
+    return tuple(summary(item) for item in res.json()["items"])
+
+
+def load_dump(path: Path) -> dict[str, dict]:
+    """Read records from a ROR data dump, keyed by ROR ID."""
+    with zipfile.ZipFile(path) as archive:
+        members = [name for name in archive.namelist() if name.endswith(".json")]
+        # Releases include the same data in both schema versions.
+        member = max(members, key=lambda name: "schema_v2" in name)
+        with archive.open(member) as f:
+            records = json.load(f)
+    return {record_id(record): record for record in records}
+
+
+class RateLimiter:
+    """Spaces calls to `wait` at least 1 / `rate` seconds apart across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        time.sleep(at - now)
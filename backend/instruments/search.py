@@ -0,0 +1,126 @@
+"""Full-text search of instruments.
+
+Every instrument has a `search_vector` built from its name, serial number,
+description, model, effective types, owners, effective manufacturers and
+locations. The vectors are refreshed by `update_vectors`, which the signal
+handlers in instruments.signals call when any of these change.
+"""
+
+from typing import Iterable
+
+from django.contrib.postgres.expressions import ArraySubquery  # type: ignore[import]
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db.models import (
+    Case,
+    Expression,
+    F,
+    Func,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+from .models import Instrument, InstrumentQuerySet, Location, Model, Organization, Type
+
+CONFIG = "simple"
+
+
+def _joined(queryset: QuerySet) -> Func:
+    return Func(
+        ArraySubquery(queryset),
+        Value(" "),
+        function="array_to_string",
+        output_field=TextField(),
+    )
+
+
+def _effective(instrument_values: QuerySet, model_values: QuerySet) -> Case:
+    # Same rule as Instrument.get_types and Instrument.get_manufacturers.
+    return Case(
+        When(model__isnull=True, then=_joined(instrument_values)),
+        default=_joined(model_values),
+    )
+
+
+def vector() -> Expression:
+    """Expression computing `Instrument.search_vector` in an UPDATE."""
+    organization_names = ("name", "acronym")
+    return (
+        SearchVector("name", "serial_number", weight="A", config=CONFIG)
+        + SearchVector(
+            Subquery(Model.objects.filter(pk=OuterRef("model_id")).values("name")),
+            _effective(
+                Type.objects.filter(instrument=OuterRef("pk")).values("name"),
+                Type.objects.filter(model=OuterRef("model_id")).values("name"),
+            ),
+            weight="B",
+            config=CONFIG,
+        )
+        + SearchVector(
+            *(
+                _joined(
+                    Organization.objects.filter(
+                        owned_instruments=OuterRef("pk")
+                    ).values(field)
+                )
+                for field in organization_names
+            ),
+            *(
+                _effective(
+                    Organization.objects.filter(
+                        manufactured_instruments=OuterRef("pk")
+                    ).values(field),
+                    Organization.objects.filter(model=OuterRef("model_id")).values(
+                        field
+                    ),
+                )
+                for field in organization_names
+            ),
+            _joined(
+                Location.objects.filter(campaign__instrument=OuterRef("pk"))
+                .values("name")
+                .distinct()
+            ),
+            weight="C",
+            config=CONFIG,
+        )
+        + SearchVector("description", weight="D", config=CONFIG)
+    )
+
+
+def update_vectors(instrument_ids: Iterable[int]) -> None:
+    Instrument.objects.filter(pk__in=list(instrument_ids)).update(
+        search_vector=vector()
+    )
+
+
+def search(text: str) -> InstrumentQuerySet:
+    """Instruments matching `text`, best matches first.
+
+    Words are matched against the search vector using web search syntax.
+    Serial numbers also match by substring or trigram similarity, so small
+    typos in them are tolerated.
+    """
+    query = SearchQuery(text, search_type="websearch", config=CONFIG)
+    return (
+        Instrument.objects.annotate(
+            rank=SearchRank(F("search_vector"), query)
+            + Coalesce(TrigramSimilarity("serial_number", text), 0.0)
+        )
+        .filter(
+            Q(search_vector=query)
+            | Q(serial_number__trigram_similar=text)
+            | Q(serial_number__icontains=text)
+        )
+        .order_by("-rank", "pk")
+    )
@@ -0,0 +1,175 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_save, pre_delete, pre_save
+from django.utils import timezone
+
+from . import documents, search
+from .models import (
+    Campaign,
+    Contact,
+    Instrument,
+    Location,
+    Model,
+    Organization,
+    Person,
+    RelatedIdentifier,
+    Type,
+    Variable,
+)
+
+
+def _ids(queryset) -> set[int]:
+    return set(queryset.values_list("pk", flat=True))
+
+
+def _with_neighbours(instrument_ids: set[int]) -> set[int]:
+    return instrument_ids | _ids(Instrument.objects.related_to(instrument_ids))
+
+
+def _with_parents(instruments) -> set[int]:
+    # Landing pages list the model types of components.
+    instrument_ids = _ids(instruments)
+    return instrument_ids | _ids(
+        Instrument.objects.filter(components__in=instrument_ids)
+    )
+
+
+def _affected_instruments(instance) -> set[int]:
+    match instance:
+        case Instrument():
+            return _with_neighbours({instance.pk})
+        case Model():
+            return _with_parents(Instrument.objects.filter(model=instance))
+        case Organization():
+            return _ids(
+                Instrument.objects.filter(
+                    Q(owners=instance)
+                    | Q(manufacturers=instance)
+                    | Q(model__manufacturers=instance)
+                )
+            )
+        case Type():
+            return _with_parents(
+                Instrument.objects.filter(Q(types=instance) | Q(model__types=instance))
+            )
+        case Variable():
+            return _ids(Instrument.objects.filter(model__variables=instance))
+        case Person():
+            return _ids(Instrument.objects.filter(contact__person=instance))
+        case Location():
+            return _ids(Instrument.objects.filter(campaign__location=instance))
+        case Campaign() | Contact() | RelatedIdentifier():
+            return {instance.instrument_id}
+    return set()
+
+
+TRACKED_MODELS = (
+    Instrument,
+    Model,
+    Organization,
+    Type,
+    Variable,
+    Person,
+    Location,
+    Campaign,
+    Contact,
+    RelatedIdentifier,
+)
+
+M2M_FIELDS = {
+    field.remote_field.through: field
+    for field in (
+        Instrument._meta.get_field("owners"),
+        Instrument._meta.get_field("manufacturers"),
+        Instrument._meta.get_field("types"),
+        Instrument._meta.get_field("components"),
+        Model._meta.get_field("manufacturers"),
+        Model._meta.get_field("types"),
+        Model._meta.get_field("variables"),
+    )
+}
+
+
+def _changed(instrument_ids: set[int]) -> None:
+    if not instrument_ids:
+        return
+    Instrument.objects.filter(pk__in=instrument_ids).update(updated_at=timezone.now())
+    documents.invalidate(instrument_ids)
+    # Relations may still change later in the transaction, e.g. on pre_clear.
+    transaction.on_commit(partial(search.update_vectors, instrument_ids))
+
+
+def bulk_changed(instruments) -> None:
+    """Handle instruments changed by bulk operations, which send no signals."""
+    _changed(_ids(instruments))
+
+
+def _remember_new_version(sender, instance: Instrument, **kwargs) -> None:
+    # The old new version loses its previous version when this changes.
+    instance._old_new_version_id = (  # type: ignore[attr-defined]
+        Instrument.objects.filter(pk=instance.pk)
+        .values_list("new_version_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+def _remember_instrument(sender, instance, **kwargs) -> None:
+    # The old instrument loses the row when it is moved to another one.
+    instance._old_instrument_id = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list("instrument_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+def _on_save(sender, instance, created: bool, **kwargs) -> None:
+    if created and not isinstance(
+        instance, (Instrument, Campaign, Contact, RelatedIdentifier)
+    ):
+        return
+    affected = _affected_instruments(instance)
+    if old_new_version_id := getattr(instance, "_old_new_version_id", None):
+        affected.add(old_new_version_id)
+    if old_instrument_id := getattr(instance, "_old_instrument_id", None):
+        affected.add(old_instrument_id)
+    _changed(affected)
+
+
+def _on_delete(sender, instance, **kwargs) -> None:
+    _changed(_affected_instruments(instance))
+
+
+def _on_m2m_changed(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    field = M2M_FIELDS[sender]
+    if pk_set is None:
+        accessor = field.remote_field.get_accessor_name() if reverse else field.name
+        assert accessor is not None
+        pk_set = _ids(getattr(instance, accessor).all())
+    sources, targets = (pk_set, {instance.pk}) if reverse else ({instance.pk}, pk_set)
+    if field.model is Model:
+        _changed(_with_parents(Instrument.objects.filter(model__in=sources)))
+    elif field.name == "components":
+        _changed(sources | targets)
+    else:
+        _changed(sources)
+
+
+pre_save.connect(_remember_new_version, sender=Instrument)
+for model in (Campaign, Contact, RelatedIdentifier):
+    pre_save.connect(_remember_instrument, sender=model)
+
+for model in TRACKED_MODELS:
+    post_save.connect(_on_save, sender=model)
+    # Relations of deleted objects are gone by the time post_delete fires.
+    pre_delete.connect(_on_delete, sender=model)
+
+for through in M2M_FIELDS:
+    m2m_changed.connect(_on_m2m_changed, sender=through)
@@ -66,9 +66,7 @@ snapshots[
     </instrumentType>
   </instrumentTypes>
   <relatedIdentifiers>
-    <relatedIdentifier relatedIdentifierType="Handle" relationType="IsComponentOf">
-          https://hdl.handle.net/21.12132/3.9084595731eb4900
-        </relatedIdentifier>
+    <relatedIdentifier relatedIdentifierType="Handle" relationType="IsComponentOf">https://hdl.handle.net/21.12132/3.9084595731eb4900</relatedIdentifier>
   </relatedIdentifiers>
 </instrument>"""
 
@@ -135,12 +133,8 @@ snapshots[
     </instrumentType>
   </instrumentTypes>
   <relatedIdentifiers>
-    <relatedIdentifier relatedIdentifierType="Handle" relationType="HasComponent">
-          https://hdl.handle.net/21.12132/3.a13475b35ed34ea3
-        </relatedIdentifier>
-    <relatedIdentifier relatedIdentifierType="Handle" relationType="HasComponent">
-          https://hdl.handle.net/21.12132/3.eab72e886cb44902
-        </relatedIdentifier>
+    <relatedIdentifier relatedIdentifierType="Handle" relationType="HasComponent">https://hdl.handle.net/21.12132/3.a13475b35ed34ea3</relatedIdentifier>
+    <relatedIdentifier relatedIdentifierType="Handle" relationType="HasComponent">https://hdl.handle.net/21.12132/3.eab72e886cb44902</relatedIdentifier>
   </relatedIdentifiers>
 </instrument>"""
 
@@ -350,9 +344,7 @@ snapshots[
     <date dateType="DeCommissioned">2011-01-05</date>
   </dates>
   <alternateIdentifiers>
-    <alternateIdentifier alternateIdentifierType="SerialNumber">
-        836514404680691
-      </alternateIdentifier>
+    <alternateIdentifier alternateIdentifierType="SerialNumber">836514404680691</alternateIdentifier>
   </alternateIdentifiers>
 </instrument>"""
 
@@ -391,9 +383,7 @@ snapshots[
     <date dateType="DeCommissioned">2011-01-05</date>
   </dates>
   <alternateIdentifiers>
-    <alternateIdentifier alternateIdentifierType="SerialNumber">
-        836514404680691
-      </alternateIdentifier>
+    <alternateIdentifier alternateIdentifierType="SerialNumber">836514404680691</alternateIdentifier>
   </alternateIdentifiers>
 </instrument>"""
 
@@ -457,9 +447,7 @@ snapshots[
     </instrumentType>
   </instrumentTypes>
   <relatedIdentifiers>
-    <relatedIdentifier relatedIdentifierType="Handle" relationType="IsNewVersionOf">
-          https://hdl.handle.net/21.12132/3.39dbf9986eef
-        </relatedIdentifier>
+    <relatedIdentifier relatedIdentifierType="Handle" relationType="IsNewVersionOf">https://hdl.handle.net/21.12132/3.39dbf9986eef</relatedIdentifier>
   </relatedIdentifiers>
 </instrument>"""
 
@@ -523,8 +511,6 @@ snapshots[
     </instrumentType>
   </instrumentTypes>
   <relatedIdentifiers>
-    <relatedIdentifier relatedIdentifierType="Handle" relationType="IsPreviousVersionOf">
-          https://hdl.handle.net/21.12132/3.1fdbc5068c7e
-        </relatedIdentifier>
+    <relatedIdentifier relatedIdentifierType="Handle" relationType="IsPreviousVersionOf">https://hdl.handle.net/21.12132/3.1fdbc5068c7e</relatedIdentifier>
   </relatedIdentifiers>
 </instrument>"""
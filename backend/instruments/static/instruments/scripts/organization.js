@@ -15,7 +15,7 @@ window.addEventListener('load', () => {
     data: {
       async src(query) {
         try {
-          const url = "https://api.ror.org/organizations?" + new URLSearchParams({
+          const url = "/ror/search?" + new URLSearchParams({
             query,
           });
           const res = await fetch(url);
@@ -1,13 +1,22 @@
 import datetime
 import doctest
+import json
+import tempfile
 import xml.etree.ElementTree as ET
-from unittest.mock import patch
+import zipfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock, patch
 
 import requests
-from django.test import Client
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
 from snapshottest.django import TestCase
 
-from . import fields
+from . import fields, httpclient, pidstub, ror, search
 from .models import (
     Campaign,
     Contact,
@@ -16,13 +25,20 @@ from .models import (
     Model,
     Organization,
     Person,
+    PidJob,
     Type,
     Variable,
+    pidinst_many,
+    update_pids,
 )
+from .snapshots.snap_tests import snapshots
+from .views import INSTRUMENT_PAGE_QUERIES
+from .vocab import OfflineVocabulary
 
 
 def load_tests(loader, tests, ignore):
     tests.addTests(doctest.DocTestSuite(fields))
+    tests.addTests(doctest.DocTestSuite(pidstub))
     return tests
 
 
@@ -100,7 +116,7 @@ class SimpleTest(TestCase):
         self.client = Client()
 
     def test_create_or_update_pid(self):
-        with patch("instruments.models.requests.post") as mock_post:
+        with patch("instruments.models.httpclient.post") as mock_post:
             response = requests.models.Response()
             response.status_code = 200
             response._content = (
@@ -209,6 +225,11 @@ class SimpleTest(TestCase):
         response = self.client.get(f"{self.endpoint}.html")
         self._test_html_response(response)
 
+    def test_html_keeps_contacts(self):
+        response = self.client.get(f"{self.endpoint}.html")
+        self.assertEqual(len(response.context["page"].pis), 2)
+        self.assertEqual(len(response.context["instrument"].contact_set.all()), 3)
+
     def test_pi_api(self):
         response = self.client.get(f"{self.endpoint}/pi")
         self._test_pi_api(response)
@@ -369,6 +390,97 @@ class ComponentsTest(TestCase):
         for test_string in test_strings:
             self.assertInHTML(test_string, response_decoded)
 
+    def test_index_locations(self):
+        station = Location.objects.create(name="Station")
+        Campaign.objects.create(
+            instrument=self.instrument4,
+            location=station,
+            date_range=(datetime.date(2020, 1, 1), None),
+        )
+        Campaign.objects.create(
+            instrument=self.instrument,
+            location=Location.objects.create(name="Airport"),
+            date_range=(datetime.date(2020, 1, 1), datetime.date(2021, 1, 1)),
+        )
+        Campaign.objects.create(
+            instrument=self.instrument4,
+            location=Location.objects.create(name="Harbour"),
+            date_range=(datetime.date(2021, 1, 1), None),
+        )
+        response = self.client.get("/")
+        self.assertEqual(
+            [group["name"] for group in response.context["locations"]],
+            ["Harbour", "Station", "Unknown"],
+        )
+        self.assertEqual(
+            response.context["locations"][0]["instruments"], [self.instrument4]
+        )
+        self.assertEqual(
+            response.context["locations"][1]["instruments"], [self.instrument4]
+        )
+        self.assertIn(self.instrument, response.context["locations"][2]["instruments"])
+
+    def test_index_query_count(self):
+        with self.assertNumQueries(3):
+            self.client.get("/")
+        for i in range(5):
+            location = Location.objects.create(name=f"Site {i}")
+            instrument = Instrument.objects.create(
+                name=f"Sensor {i}", pid=f"https://hdl.handle.net/21.12132/3.{i}"
+            )
+            instrument.types.add(*self.instrument4.types.all())
+            Campaign.objects.create(
+                instrument=instrument,
+                location=location,
+                date_range=(datetime.date(2020, 1, 1), None),
+            )
+        with self.assertNumQueries(3):
+            self.client.get("/")
+
+    def test_html_query_count(self):
+        instrument = self.instrument2
+        self.instrument.new_version = instrument
+        self.instrument.save()
+        instrument.new_version = Instrument.objects.create(name="Newest sensor")
+        instrument.save()
+
+        def add_relations(count: int) -> None:
+            for i in range(count):
+                Campaign.objects.create(
+                    instrument=instrument,
+                    location=Location.objects.create(name=f"Site {i}"),
+                    date_range=(datetime.date(2000 + i, 1, 1), None),
+                )
+                Contact.objects.create(
+                    instrument=instrument,
+                    person=Person.objects.create(first_name="Jane", last_name=f"{i}"),
+                    role=Contact.PI,
+                    date_range=(datetime.date(2000 + i, 1, 1), None),
+                )
+                component = Instrument.objects.create(
+                    name=f"Part {i}", model=self.instrument3.model
+                )
+                instrument.components.add(component)
+                instrument.related_identifiers.create(
+                    identifier=f"https://example.com/{i}",
+                    identifier_type="URL",
+                    relation_type="References",
+                )
+
+        url = f"/instrument/{instrument.uuid}.html"
+        add_relations(1)
+        with self.assertNumQueries(INSTRUMENT_PAGE_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.context["page"].citation[:9], "0, J. (20")
+        add_relations(5)
+        with self.assertNumQueries(INSTRUMENT_PAGE_QUERIES):
+            response = self.client.get(url)
+        page = response.context["page"]
+        self.assertEqual(len(page.campaigns), 6)
+        self.assertEqual(page.campaigns[0].location.name, "Site 4")
+        self.assertEqual(page.parents, (self.instrument4,))
+        self.assertEqual(page.previous_version, self.instrument)
+
     def test_parent_xml(self):
         response = self.client.get(
             "/instrument/90845957-31eb-4900-89a5-78696ec0453d.xml"
@@ -435,6 +547,170 @@ class ComponentsTest(TestCase):
         self.assertEqual(response.headers["Content-Type"], "application/json")
         self.assertMatchSnapshot(response.json())
 
+    def test_json_cached(self):
+        url = f"/instrument/{self.instrument4.uuid}.json"
+        expected = self.client.get(url).content
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.content, expected)
+
+    def test_cache_invalidated_by_organization(self):
+        url = f"/instrument/{self.instrument2.uuid}.xml"
+        self.client.get(url)
+        manufacturer = Organization.objects.get(name="ACME")
+        manufacturer.name = "ACME Corporation"
+        manufacturer.save()
+        self.assertContains(self.client.get(url), "ACME Corporation")
+
+    def test_cache_invalidated_by_component_pid(self):
+        url = f"/instrument/{self.instrument4.uuid}.json"
+        self.client.get(url)
+        self.instrument3.pid = "https://hdl.handle.net/21.12132/3.eab72e886cb4ffff"
+        self.instrument3.save()
+        self.assertContains(self.client.get(url), self.instrument3.pid)
+
+    def test_cache_invalidated_by_reassignment(self):
+        campaign = Campaign.objects.create(
+            instrument=self.instrument2,
+            location=Location.objects.create(name="Station"),
+            date_range=(datetime.date(2020, 1, 1), None),
+        )
+        url = f"/instrument/{self.instrument2.uuid}.json"
+        response = self.client.get(url)
+        self.assertIn("Dates", response.json())
+        campaign.instrument = self.instrument3
+        campaign.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Dates", response.json())
+
+    def test_cache_invalidated_by_components(self):
+        parent_url = f"/instrument/{self.instrument4.uuid}.json"
+        child_url = f"/instrument/{self.instrument3.uuid}.json"
+        self.client.get(parent_url)
+        self.client.get(child_url)
+        self.instrument4.components.remove(self.instrument3)
+        self.assertNotContains(self.client.get(parent_url), self.instrument3.pid)
+        self.assertNotContains(self.client.get(child_url), self.instrument4.pid)
+
+    def test_json_not_modified(self):
+        url = f"/instrument/{self.instrument2.uuid}.json"
+        etag = self.client.get(url).headers["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_etag_changes_with_related_rows(self):
+        url = f"/instrument/{self.instrument4.uuid}.xml"
+        etag = self.client.get(url).headers["ETag"]
+        self.instrument3.pid = "https://hdl.handle.net/21.12132/3.eab72e886cb4ffff"
+        self.instrument3.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_etag_changes_with_person_and_location(self):
+        person = Person.objects.create(first_name="Jane", last_name="Doe")
+        location = Location.objects.create(name="Station")
+        Contact.objects.create(
+            instrument=self.instrument2,
+            person=person,
+            role=Contact.PI,
+            date_range=(datetime.date(2020, 1, 1), None),
+        )
+        Campaign.objects.create(
+            instrument=self.instrument2,
+            location=location,
+            date_range=(datetime.date(2020, 1, 1), None),
+        )
+        url = f"/instrument/{self.instrument2.uuid}.html"
+        for obj, field in [(person, "last_name"), (location, "name")]:
+            etag = self.client.get(url).headers["ETag"]
+            setattr(obj, field, "Renamed")
+            obj.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, "Renamed")
+
+    def test_etag_changes_with_component_types(self):
+        url = f"/instrument/{self.instrument4.uuid}.html"
+        etag = self.client.get(url).headers["ETag"]
+        Model.objects.get(name="ACME H1").types.add(
+            Type.objects.create(name="Thermometer")
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Thermometer")
+
+        etag = response.headers["ETag"]
+        humidity = Type.objects.get(name="Humidity sensor")
+        humidity.name = "Hygrometer"
+        humidity.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Hygrometer")
+
+    def test_html_not_modified_since(self):
+        url = f"/instrument/{self.instrument2.uuid}.html"
+        last_modified = self.client.get(url).headers["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_export_json(self):
+        Instrument.objects.create(name="Draft sensor")
+        response = self.client.get("/instruments.ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Type"], "application/x-ndjson")
+        lines = response.getvalue().splitlines()
+        expected = [
+            self.client.get(f"/instrument/{instrument.uuid}.json").content
+            for instrument in Instrument.objects.order_by("pk")
+            if instrument.pid
+        ]
+        self.assertEqual(lines, expected)
+
+    def test_export_xml(self):
+        Instrument.objects.create(name="Draft sensor")
+        response = self.client.get("/instruments.xml")
+        self.assertEqual(response.status_code, 200)
+        documents = list(ET.XML(response.getvalue()))
+        expected = [
+            ET.XML(self.client.get(f"/instrument/{instrument.uuid}.xml").content)
+            for instrument in Instrument.objects.order_by("pk")
+            if instrument.pid
+        ]
+        self.assertEqual(
+            [ET.tostring(element) for element in documents],
+            [ET.tostring(element) for element in expected],
+        )
+
+    def test_xml_shares_json_rendering(self):
+        self.client.get(f"/instrument/{self.instrument2.uuid}.json")
+        with self.assertNumQueries(2):
+            self.client.get(f"/instrument/{self.instrument2.uuid}.xml")
+
+    def test_pidinst_many(self):
+        instruments = Instrument.objects.filter(
+            pk__in=[self.instrument2.pk, self.instrument4.pk]
+        ).order_by("pk")
+        self.assertEqual(
+            pidinst_many(instruments),
+            [
+                snapshots["ComponentsTest::test_child_json 1"],
+                snapshots["ComponentsTest::test_parent_json 1"],
+            ],
+        )
+
+    def test_pidinst_many_query_count(self):
+        with self.assertNumQueries(12):
+            pidinst_many(Instrument.objects.all())
+        for i in range(10):
+            instrument = Instrument.objects.create(name=f"Extra sensor {i}")
+            instrument.owners.add(*self.instrument.owners.all())
+            self.instrument4.components.add(instrument)
+        with self.assertNumQueries(12):
+            pidinst_many(Instrument.objects.all())
+
 
 class VersionsTest(TestCase):
     new_instrument: Instrument
@@ -527,3 +803,1041 @@ class VersionsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.headers["Content-Type"], "application/json")
         self.assertMatchSnapshot(response.json())
+
+    def test_versions(self):
+        newest = Instrument.objects.create(name="Newest temperature sensor version")
+        self.new_instrument.new_version = newest
+        self.new_instrument.save()
+        with self.assertNumQueries(1):
+            versions = self.new_instrument.versions()
+        self.assertEqual(
+            [(version.name, version.version_offset) for version in versions],
+            [
+                ("Old temperature sensor version", -1),
+                ("New temperature sensor version", 0),
+                ("Newest temperature sensor version", 1),
+            ],
+        )
+        self.assertEqual(
+            [version.pk for version in newest.versions()],
+            [version.pk for version in versions],
+        )
+        response = self.client.get(f"/instrument/{self.old_instrument.uuid}/versions")
+        self.assertEqual(
+            [(item["pid"], item["offset"]) for item in response.json()],
+            [
+                (self.old_instrument.pid, 0),
+                (self.new_instrument.pid, 1),
+                (None, 2),
+            ],
+        )
+
+
+class PidJobTest(TestCase):
+    instrument: Instrument
+    component: Instrument
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        owner = Organization.objects.create(name="My institute")
+        cls.instrument = Instrument.objects.create(
+            uuid="8fd884df-6896-4bae-a72f-b6260b5b8744", name="My weather station"
+        )
+        cls.instrument.owners.add(owner)
+        cls.component = Instrument.objects.create(
+            uuid="3b2a6e6b-0f4c-4b52-9d2e-3f2a1c9b8e71",
+            pid="https://hdl.handle.net/21.12132/3.3b2a6e6b0f4c4b52",
+            name="My thermometer",
+        )
+        cls.component.owners.add(owner)
+        cls.instrument.components.add(cls.component)
+
+    def test_create_pid_queues_job(self):
+        self.client.force_login(User.objects.create_superuser("admin"))
+        response = self.client.get(f"/instrument/{self.instrument.uuid}/create_pid")
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(self.client.get(response.url), "PID creation queued")
+        job = PidJob.objects.get(instrument=self.instrument)
+        self.assertEqual(job.status, PidJob.PENDING)
+        self.instrument.refresh_from_db()
+        self.assertIsNone(self.instrument.pid)
+
+    def test_enqueue_merges_pending_jobs(self):
+        PidJob.enqueue(self.instrument, register=False)
+        PidJob.enqueue(self.instrument, propagate=False)
+        job = PidJob.objects.get(instrument=self.instrument)
+        self.assertTrue(job.register)
+        self.assertTrue(job.propagate)
+
+    def test_worker(self):
+        PidJob.enqueue(self.instrument)
+        stdout = StringIO()
+        with pidstub.PidServiceStub() as stub:
+            with override_settings(PID_SERVICE_URL=stub.url):
+                call_command("pidworker", "--once", stdout=stdout)
+        self.assertRegex(stdout.getvalue(), r"127\.0\.0\.1: \d+ requests, ")
+        self.instrument.refresh_from_db()
+        self.assertEqual(
+            self.instrument.pid, "https://hdl.handle.net/21.12132/3.8fd884df68964bae"
+        )
+        self.assertEqual(
+            [payload["uuid"] for payload in stub.payloads],
+            [str(self.instrument.uuid), str(self.component.uuid)],
+        )
+        self.assertEqual(PidJob.objects.get().status, PidJob.DONE)
+
+    def test_worker_retry(self):
+        job = PidJob.enqueue(self.instrument, propagate=False)
+        with pidstub.PidServiceStub(failures=1) as stub:
+            with override_settings(PID_SERVICE_URL=stub.url):
+                call_command(
+                    "pidworker", "--once", stdout=StringIO(), stderr=StringIO()
+                )
+                job.refresh_from_db()
+                self.assertEqual(job.status, PidJob.PENDING)
+                self.assertEqual(job.attempts, 1)
+                self.assertGreater(job.run_after, timezone.now())
+                job.run_after = timezone.now()
+                job.save()
+                call_command("pidworker", "--once", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, PidJob.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_heartbeat(self):
+        PidJob.enqueue(self.instrument)
+        heartbeat = Mock()
+        with patch(
+            "instruments.models._register_payload",
+            side_effect=lambda payload: f"https://hdl.handle.net/{payload['uuid']}",
+        ):
+            update_pids([self.instrument], [self.instrument], heartbeat=heartbeat)
+        # The instrument and then its component are registered.
+        self.assertEqual(heartbeat.call_count, 2)
+
+        def slow_update_pids(register, propagate, heartbeat):
+            PidJob.objects.update(updated_at=timezone.now() - 2 * PidJob.STALE_AFTER)
+            heartbeat()
+            self.assertEqual(PidJob.claim(), [])
+            return {}
+
+        with patch("instruments.models.update_pids", side_effect=slow_update_pids):
+            PidJob.run_batch(PidJob.claim())
+        self.assertEqual(PidJob.objects.get().status, PidJob.DONE)
+
+    def test_registration_keeps_concurrent_edits(self):
+        def register(payload):
+            Instrument.objects.filter(pk=self.instrument.pk).update(name="Renamed")
+            return "https://hdl.handle.net/21.12132/3.8fd884df68964bae"
+
+        with patch("instruments.models._register_payload", side_effect=register):
+            self.instrument.create_or_update_pid()
+        self.instrument.refresh_from_db()
+        self.assertEqual(self.instrument.name, "Renamed")
+        self.assertIsNotNone(self.instrument.pid)
+
+
+class HttpClientTest(TestCase):
+    def test_stats(self):
+        with pidstub.PidServiceStub(failures=1) as stub:
+            before = httpclient.stats().get("127.0.0.1", {})
+            self.assertEqual(httpclient.post(stub.url, json={}).status_code, 500)
+            httpclient.post(stub.url, json={"uuid": "x"}).raise_for_status()
+        after = httpclient.stats()["127.0.0.1"]
+        self.assertEqual(after["requests"] - before.get("requests", 0), 2)
+        self.assertEqual(after["errors"] - before.get("errors", 0), 1)
+        self.assertGreater(after["seconds"], 0)
+
+    @override_settings(HTTP_TIMEOUTS={"pid.test": (1, 2)})
+    def test_timeout(self):
+        with patch.object(httpclient._get_session(), "request") as mock_request:
+            httpclient.post("http://pid.test/pid/", json={})
+            httpclient.get("http://other.test/")
+        self.assertEqual(mock_request.call_args_list[0].kwargs["timeout"], (1, 2))
+        self.assertEqual(mock_request.call_args_list[1].kwargs["timeout"], (3.05, 30))
+
+
+class ServerTimingTest(TestCase):
+    def test_queries(self):
+        instrument = Instrument.objects.create(name="Timed sensor")
+        with self.assertLogs("instruments.middleware", "INFO") as logs:
+            response = self.client.get(f"/instrument/{instrument.uuid}.json")
+        self.assertRegex(
+            response.headers["Server-Timing"],
+            r'^sql;dur=[0-9.]+;desc="SQL queries: [1-9][0-9]*", '
+            r'http;dur=0\.0;desc="HTTP requests: 0", total;dur=[0-9.]+$',
+        )
+        self.assertIn("view=instrument method=GET status=200", logs.output[0])
+        self.assertEqual(logs.records[0].view, "instrument")
+
+    def test_http(self):
+        client = Client()
+        client.force_login(User.objects.create_user("staff", is_staff=True))
+        api_response = requests.Response()
+        api_response.status_code = 200
+        api_response._content = b'{"items": []}'
+        ror.search.cache_clear()
+        with patch.object(
+            httpclient._get_session(), "request", return_value=api_response
+        ), self.assertLogs("instruments.middleware", "INFO") as logs:
+            response = client.get("/ror/search?query=timing")
+        ror.search.cache_clear()
+        self.assertIn('desc="HTTP requests: 1"', response.headers["Server-Timing"])
+        self.assertEqual(logs.records[0].view, "ror_search")
+        self.assertEqual(logs.records[0].http_requests, 1)
+
+
+class BenchmarkTest(TestCase):
+    def test_benchmark(self):
+        out = StringIO()
+        # Tests run with DEBUG disabled, like production.
+        with self.assertRaises(CommandError):
+            call_command("gendata", instruments=30, stdout=out)
+        call_command("gendata", instruments=30, seed=1, force=True, stdout=out)
+        self.assertIn("Generated 30 instruments", out.getvalue())
+        self.assertEqual(Instrument.objects.count(), 30)
+        self.assertTrue(Instrument.objects.filter(new_version__isnull=False).exists())
+        self.assertTrue(Instrument.objects.filter(components__isnull=False).exists())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = Path(tmpdir) / "results.json"
+            call_command("benchmark", iterations=2, output=output, stdout=out)
+            call_command(
+                "benchmark", iterations=2, output=output, compare=output, stdout=out
+            )
+            report = json.loads(output.read_text())
+        self.assertEqual(
+            list(report["results"]),
+            [
+                "index",
+                "instrument.json",
+                "instrument.xml",
+                "instrument.html",
+                "pi",
+                "logbook:view",
+                "create_pid",
+            ],
+        )
+        self.assertGreater(report["results"]["create_pid"]["queries"], 0)
+        self.assertFalse(
+            Instrument.objects.filter(pid__isnull=True, pid_jobs__isnull=False).exists()
+        )
+
+
+class UpdatePidsTest(TestCase):
+    parents: list[Instrument]
+    shared: Instrument
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        owner = Organization.objects.create(name="My institute")
+        cls.shared = Instrument.objects.create(
+            uuid="0f0e4c3c-8c2d-4a55-9c57-1b5a7dbd6e01",
+            pid="https://hdl.handle.net/21.12132/3.0f0e4c3c8c2d4a55",
+            name="Shared power supply",
+        )
+        cls.shared.owners.add(owner)
+        cls.parents = []
+        for i in range(5):
+            parent = Instrument.objects.create(name=f"Station {i}")
+            parent.owners.add(owner)
+            parent.components.add(cls.shared)
+            cls.parents.append(parent)
+
+    def setUp(self):
+        self.stub = pidstub.PidServiceStub()
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        settings = override_settings(PID_SERVICE_URL=self.stub.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _posted_uuids(self) -> list[str]:
+        return [payload["uuid"] for payload in self.stub.payloads]
+
+    def test_shared_neighbour_registered_once(self):
+        failures = update_pids(register=self.parents, propagate=self.parents)
+        self.assertEqual(failures, {})
+        uuids = self._posted_uuids()
+        self.assertEqual(len(uuids), 6)
+        self.assertEqual(uuids[-1], str(self.shared.uuid))
+        for parent in self.parents:
+            parent.refresh_from_db()
+            self.assertIsNotNone(parent.pid)
+
+    def test_registered_neighbour_repeated_after_minting(self):
+        instruments = [self.parents[0], self.shared]
+        update_pids(register=instruments, propagate=instruments)
+        self.assertEqual(
+            self._posted_uuids().count(str(self.shared.uuid)),
+            2,
+        )
+
+    def test_unchanged_payloads_skipped(self):
+        # The second round adds the minted PIDs to the records.
+        update_pids(register=self.parents, propagate=self.parents)
+        update_pids(register=self.parents, propagate=self.parents)
+        count = len(self.stub.payloads)
+        update_pids(register=self.parents, propagate=self.parents)
+        self.assertEqual(len(self.stub.payloads), count)
+        self.shared.name = "Shared battery"
+        self.shared.save()
+        update_pids(register=[self.shared], propagate=[])
+        self.assertEqual(self._posted_uuids()[count:], [str(self.shared.uuid)])
+
+    def test_create_or_update_pid_unchanged(self):
+        self.parents[0].create_or_update_pid()
+        self.parents[0].create_or_update_pid()
+        self.assertEqual(len(self.stub.payloads), 2)
+        self.parents[0].create_or_update_pid()
+        self.assertEqual(len(self.stub.payloads), 2)
+
+    def test_neighbour_sees_minted_pids(self):
+        update_pids(register=self.parents, propagate=self.parents)
+        payload = self.stub.payloads[-1]
+        self.assertEqual(payload["uuid"], str(self.shared.uuid))
+        related = next(
+            json.loads(item["value"])
+            for item in payload["data"]
+            if item["type"] == "21.T11148/178fb558abc755ca7046"
+        )
+        self.assertEqual(
+            sorted(
+                item["relatedIdentifier"]["relatedIdentifierType"] for item in related
+            ),
+            ["Handle"] * 5,
+        )
+
+    def test_admin_action_batch(self):
+        for parent in self.parents:
+            PidJob.enqueue(parent)
+        call_command("pidworker", "--once", stdout=StringIO())
+        self.assertEqual(len(self._posted_uuids()), 6)
+        self.assertFalse(PidJob.objects.exclude(status=PidJob.DONE).exists())
+
+    def test_failed_neighbour(self):
+        for parent in self.parents:
+            parent.pid = f"https://hdl.handle.net/21.12132/3.{parent.pk}"
+            parent.save()
+        PidJob.enqueue(self.parents[0], register=False)
+        self.stub.failures = 1
+        call_command("pidworker", "--once", stdout=StringIO(), stderr=StringIO())
+        job = PidJob.objects.get()
+        self.assertEqual(job.status, PidJob.PENDING)
+        self.assertEqual(job.attempts, 1)
+
+
+VOCAB = "https://vocabulary.actris.nilu.no/actris_vocab/"
+
+
+def _concept(name: str, label: str, broader: list[str]) -> dict:
+    concept: dict = {"uri": VOCAB + name, "prefLabel": {"value": label}}
+    if broader:
+        concept["broader"] = [{"uri": VOCAB + item} for item in broader]
+    return concept
+
+
+class VocabularyTest(TestCase):
+    CONCEPTS = {
+        "instrumenttype": _concept("instrumenttype", "Instrument type", []),
+        "lidar": _concept("lidar", "Lidar", ["instrumenttype"]),
+        "dopplerlidar": _concept("dopplerlidar", "Doppler lidar", ["lidar"]),
+        "halo": _concept("halo", "HALO Photonics", ["dopplerlidar", "company"]),
+        "company": _concept("company", "Company", []),
+    }
+
+    def setUp(self):
+        self.model = Model.objects.create(name="StreamLine", concept_url=VOCAB + "halo")
+        self.requests: list[tuple[str, dict]] = []
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+
+    def _get(self, url, headers):
+        self.requests.append((url, headers))
+        response = requests.Response()
+        response.url = url
+        if headers.get("If-None-Match") == '"v1"':
+            response.status_code = 304
+            return response
+        concept = self.CONCEPTS[url.removeprefix(VOCAB)]
+        graph = [concept] + [
+            self.CONCEPTS[item["uri"].removeprefix(VOCAB)]
+            for item in concept.get("broader", [])
+        ]
+        response.status_code = 200
+        response.headers["ETag"] = '"v1"'
+        response._content = json.dumps({"graph": graph}).encode()
+        return response
+
+    def _sync(self, *args) -> str:
+        out = StringIO()
+        with patch("instruments.vocab.httpclient.get", side_effect=self._get):
+            call_command("syncvocab", "--cache-dir", self.cache_dir, *args, stdout=out)
+        self.assertEqual(
+            list(self.model.types.values_list("name", flat=True)),
+            ["Doppler lidar"],
+        )
+        return out.getvalue()
+
+    def test_sync(self):
+        self._sync()
+        self.assertEqual(
+            sorted(url.removeprefix(VOCAB) for url, _headers in self.requests),
+            ["company", "dopplerlidar", "halo", "lidar"],
+        )
+        self.assertTrue(all("If-None-Match" not in h for _url, h in self.requests))
+
+    def test_revalidate(self):
+        self._sync()
+        self.requests.clear()
+        self._sync()
+        self.assertEqual(len(self.requests), 4)
+        self.assertTrue(all(h["If-None-Match"] == '"v1"' for _url, h in self.requests))
+
+    def test_max_age(self):
+        self._sync()
+        self.requests.clear()
+        self._sync("--max-age", "3600")
+        self.assertEqual(self.requests, [])
+
+    def _write_dump(self, concepts: list[dict]) -> Path:
+        dump = {
+            "@context": {"skos": "http://www.w3.org/2004/02/skos/core#"},
+            "@graph": [
+                {
+                    "@id": concept["uri"],
+                    "skos:prefLabel": [
+                        {"@language": "fi", "@value": "?"},
+                        {"@language": "en", "@value": concept["prefLabel"]["value"]},
+                    ],
+                    "skos:broader": [
+                        {"@id": item["uri"]} for item in concept.get("broader", [])
+                    ],
+                }
+                for concept in concepts
+            ],
+        }
+        path = self.cache_dir / "vocabulary.jsonld"
+        path.write_text(json.dumps(dump))
+        return path
+
+    def test_dump(self):
+        self._sync("--dump", self._write_dump(list(self.CONCEPTS.values())))
+        self.assertEqual(self.requests, [])
+
+    def test_dump_missing_concept(self):
+        Model.objects.create(name="Mystery", concept_url=VOCAB + "mystery")
+        err = StringIO()
+        call_command(
+            "syncvocab",
+            "--dump",
+            self._write_dump(list(self.CONCEPTS.values())),
+            stdout=StringIO(),
+            stderr=err,
+        )
+        self.assertIn(f"Skipped Mystery: concept {VOCAB}mystery", err.getvalue())
+        self.assertEqual(
+            list(self.model.types.values_list("name", flat=True)), ["Doppler lidar"]
+        )
+
+    def test_closure(self):
+        vocabulary = OfflineVocabulary(
+            [
+                {"uri": "a", "broader": [{"uri": "b"}]},
+                {"uri": "b", "broader": [{"uri": "c"}, {"uri": "missing"}]},
+                {"uri": "c", "broader": {"uri": "a"}},
+                {"uri": "d", "broader": [{"uri": "a"}]},
+            ]
+        )
+        self.assertEqual(vocabulary.ancestors["d"], {"a", "b", "c"})
+        self.assertEqual(vocabulary.ancestors["a"], {"a", "b", "c"})
+        self.assertTrue(vocabulary.descends_from("d", "c"))
+        self.assertFalse(vocabulary.descends_from("c", "d"))
+
+    def test_diff(self):
+        instrument = Instrument.objects.create(name="Lidar 1", model=self.model)
+        self.assertIn("1 types created, 0 updated, 1 links added", self._sync())
+        self.assertIn("0 types created, 0 updated, 0 links added", self._sync())
+
+        Type.objects.filter(name="Doppler lidar").update(name="Wind lidar")
+        self.model.types.add(Type.objects.create(name="Stale"))
+        before = Instrument.objects.get(pk=instrument.pk).updated_at
+        output = self._sync()
+        self.assertIn("Updated type Doppler lidar", output)
+        self.assertIn("Removed type Stale from StreamLine", output)
+        self.assertIn("0 types created, 1 updated, 0 links added, 1 removed", output)
+        self.assertGreater(Instrument.objects.get(pk=instrument.pk).updated_at, before)
+
+
+class RorTest(TestCase):
+    RECORDS = [
+        {
+            "id": "https://ror.org/05hppb561",
+            "names": [
+                {"value": "Finnish Meteorological Institute", "types": ["ror_display"]},
+                {"value": "FMI", "types": ["acronym"]},
+            ],
+        },
+        {
+            "id": "https://ror.org/0abcde068",
+            "names": [{"value": "Renamed institute", "types": ["ror_display"]}],
+        },
+    ]
+
+    def setUp(self):
+        self.fmi = Organization.objects.create(
+            name="Finnish Meteorological Institute", acronym="FMI", ror_id="05hppb561"
+        )
+        self.other = Organization.objects.create(
+            name="Old name", acronym="OI", ror_id="0abcde068"
+        )
+        Organization.objects.create(name="No ROR")
+        self.instrument = Instrument.objects.create(name="Instrument")
+        self.instrument.owners.add(self.other)
+
+    def _check(self, out: StringIO):
+        self.assertIn("2 organizations: 1 updated, 0 failed", out.getvalue())
+        self.other.refresh_from_db()
+        self.assertEqual(str(self.other), "Renamed institute (OI)")
+
+    def test_dump(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "v1.50-ror-data.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("v1.50-ror-data.json", "[]")
+            archive.writestr("v1.50-ror-data_schema_v2.json", json.dumps(self.RECORDS))
+        before = Instrument.objects.get(pk=self.instrument.pk).updated_at
+        out = StringIO()
+        call_command("syncror", "--dump", path, stdout=out)
+        self._check(out)
+        self.assertGreater(
+            Instrument.objects.get(pk=self.instrument.pk).updated_at, before
+        )
+
+    def test_api(self):
+        records = {ror.record_id(record): record for record in self.RECORDS}
+
+        def get(url):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(records[url.rsplit("/", 1)[-1]]).encode()
+            return response
+
+        out = StringIO()
+        with patch("instruments.ror.httpclient.get", side_effect=get) as mock_get:
+            call_command("syncror", "--rate", "1000", stdout=out)
+        self.assertEqual(mock_get.call_count, 2)
+        self._check(out)
+
+    def test_search(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "v1.50-ror-data.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("v1.50-ror-data_schema_v2.json", json.dumps(self.RECORDS))
+        out = StringIO()
+        call_command("syncror", "--dump", path, "--index", stdout=out)
+        self.assertIn("Indexed 2 ROR records", out.getvalue())
+
+        client = Client()
+        self.assertEqual(client.get("/ror/search?query=fmi").status_code, 302)
+        client.force_login(User.objects.create_user("staff", is_staff=True))
+        response = client.get("/ror/search?query=fmi")
+        self.assertEqual(
+            response.json()["items"],
+            [
+                {
+                    "id": "https://ror.org/05hppb561",
+                    "name": "Finnish Meteorological Institute",
+                    "acronyms": ["FMI"],
+                }
+            ],
+        )
+        response = client.get("/ror/search?query=renamed")
+        self.assertEqual(
+            [item["name"] for item in response.json()["items"]], ["Renamed institute"]
+        )
+
+        ror.search.cache_clear()
+        api_response = requests.Response()
+        api_response.status_code = 200
+        api_response._content = json.dumps(
+            {"items": [{"id": "https://ror.org/0abcde068", **self.RECORDS[1]}]}
+        ).encode()
+        with patch(
+            "instruments.ror.httpclient.get", return_value=api_response
+        ) as mock_get:
+            for _ in range(2):
+                response = client.get("/ror/search?query=Elsewhere")
+                self.assertEqual(len(response.json()["items"]), 1)
+        mock_get.assert_called_once()
+        ror.search.cache_clear()
+
+    def test_schema_v1(self):
+        record = {"id": "https://ror.org/05hppb561", "name": "FMI", "acronyms": []}
+        self.assertEqual(ror.parse(record), ("FMI", None))
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lidar = Type.objects.create(name="Doppler lidar")
+            halo = Organization.objects.create(name="HALO Photonics", acronym="HALO")
+            model = Model.objects.create(name="StreamLine")
+            model.types.add(lidar)
+            model.manufacturers.add(halo)
+            self.streamline = Instrument.objects.create(
+                name="Hyytiälä lidar",
+                pid="https://hdl.handle.net/21.12132/3.streamline",
+                model=model,
+                serial_number="SN-0412-78",
+            )
+            self.streamline.owners.add(
+                Organization.objects.create(name="University of Helsinki")
+            )
+            Campaign.objects.create(
+                instrument=self.streamline,
+                location=Location.objects.create(name="Hyytiälä"),
+                date_range=(datetime.date(2020, 1, 1), None),
+            )
+            self.custom = Instrument.objects.create(
+                name="Custom radiometer",
+                pid="https://hdl.handle.net/21.12132/3.custom",
+                description="Built from spare lidar parts.",
+            )
+            self.custom.types.add(Type.objects.create(name="Microwave radiometer"))
+
+    def _search(self, query: str, **params) -> dict:
+        response = self.client.get("/instruments/search", {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _names(self, query: str) -> list[str]:
+        return [item["name"] for item in self._search(query)["results"]]
+
+    def test_fields(self):
+        self.assertEqual(self._names("doppler"), ["Hyytiälä lidar"])
+        self.assertEqual(self._names("halo"), ["Hyytiälä lidar"])
+        self.assertEqual(self._names("helsinki"), ["Hyytiälä lidar"])
+        self.assertEqual(self._names("hyytiälä"), ["Hyytiälä lidar"])
+        self.assertEqual(self._names("microwave"), ["Custom radiometer"])
+        self.assertEqual(self._names("lidar"), ["Hyytiälä lidar", "Custom radiometer"])
+        self.assertEqual(self._names("lidar -doppler"), ["Custom radiometer"])
+
+    def test_serial_number(self):
+        self.assertEqual(self._names("0412"), ["Hyytiälä lidar"])
+        self.assertEqual(self._names("SN-0421-78"), ["Hyytiälä lidar"])
+        self.assertEqual(self._names("sn-0412"), ["Hyytiälä lidar"])
+
+    def test_uses_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = search.search("0412").explain()
+        self.assertNotIn("Seq Scan", plan)
+        for index in [
+            "instrument_search_vector",
+            "instrument_serial_number_trgm",
+            "instrument_serial_upper_trgm",
+        ]:
+            self.assertIn(index, plan)
+
+    def test_maintained(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Model.objects.get(name="StreamLine").types.clear()
+        self.assertEqual(self._names("doppler"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Organization.objects.filter(name="HALO Photonics").get().delete()
+        self.assertEqual(self._names("halo"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            location = Location.objects.get(name="Hyytiälä")
+            location.name = "Hyytiälä station"
+            location.save()
+        self.assertEqual(self._names("station"), ["Hyytiälä lidar"])
+
+    def test_pagination(self):
+        with patch("instruments.views.SEARCH_PAGE_SIZE", 1):
+            data = self._search("lidar", page=2)
+        self.assertEqual((data["count"], data["page"], data["pages"]), (2, 2, 2))
+        self.assertEqual(data["results"][0]["name"], "Custom radiometer")
+        self.assertEqual(data["results"][0]["types"], ["Microwave radiometer"])
+
+    def test_missing_query(self):
+        self.assertEqual(self.client.get("/instruments/search").status_code, 400)
+
+    def test_drafts_hidden(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Instrument.objects.create(name="Draft lidar")
+        self.assertNotIn("Draft lidar", self._names("lidar"))
+        self.client.force_login(User.objects.create_user("user"))
+        self.assertIn("Draft lidar", self._names("lidar"))
+
+    def test_update_command(self):
+        Instrument.objects.update(search_vector=None)
+        self.assertEqual(self._names("doppler"), [])
+        out = StringIO()
+        call_command("updatesearch", stdout=out)
+        self.assertIn("Updated 2 instruments", out.getvalue())
+        self.assertEqual(self._names("doppler"), ["Hyytiälä lidar"])
+
+        Instrument.objects.filter(pk=self.custom.pk).update(search_vector=None)
+        out = StringIO()
+        call_command("updatesearch", "--missing", stdout=out)
+        self.assertIn("Updated 1 instruments", out.getvalue())
+        self.assertEqual(self._names("radiometer"), ["Custom radiometer"])
+
+
+class ListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        lidar = Type.objects.create(name="Doppler lidar")
+        radar = Type.objects.create(name="Cloud radar")
+        model = Model.objects.create(name="StreamLine")
+        model.types.add(lidar)
+        fmi = Organization.objects.create(name="FMI", ror_id="05hppb561")
+        person = Person.objects.create(
+            first_name="Ewan", last_name="O'Connor", orcid_id="0000-0001-5109-3700"
+        )
+        hyytiala = Location.objects.create(name="Hyytiälä")
+        kenttarova = Location.objects.create(name="Kenttärova")
+        for i in range(5):
+            instrument = Instrument.objects.create(
+                name=f"Lidar {i}",
+                pid=f"https://hdl.handle.net/21.12132/3.lidar{i}",
+                model=model if i % 2 == 0 else None,
+            )
+            if i % 2 == 1:
+                instrument.types.add(radar if i == 1 else lidar)
+            if i < 2:
+                instrument.owners.add(fmi)
+                Contact.objects.create(
+                    person=person,
+                    instrument=instrument,
+                    role=Contact.PI,
+                    date_range=(datetime.date(2020, 1, 1), None),
+                )
+            Campaign.objects.create(
+                instrument=instrument,
+                location=hyytiala if i < 3 else kenttarova,
+                date_range=(datetime.date(2020 + i, 1, 1), datetime.date(2030, 1, 1)),
+            )
+
+    def _names(self, **params) -> list[str]:
+        response = self.client.get("/instruments", params)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()["results"]]
+
+    def test_filters(self):
+        self.assertEqual(len(self._names()), 5)
+        self.assertEqual(self._names(location="Kenttärova"), ["Lidar 3", "Lidar 4"])
+        self.assertEqual(self._names(date="2021-06-01"), ["Lidar 0", "Lidar 1"])
+        self.assertEqual(
+            self._names(date="2023-06-01", location="Hyytiälä"),
+            ["Lidar 0", "Lidar 1", "Lidar 2"],
+        )
+        self.assertEqual(self._names(type="Cloud radar"), ["Lidar 1"])
+        self.assertEqual(
+            self._names(type="Doppler lidar"),
+            ["Lidar 0", "Lidar 2", "Lidar 3", "Lidar 4"],
+        )
+        self.assertEqual(
+            self._names(model="StreamLine"), ["Lidar 0", "Lidar 2", "Lidar 4"]
+        )
+        self.assertEqual(
+            self._names(owner="https://ror.org/05hppb561"), ["Lidar 0", "Lidar 1"]
+        )
+        self.assertEqual(self._names(pi="0000-0001-5109-3700"), ["Lidar 0", "Lidar 1"])
+        self.assertEqual(
+            self._names(
+                commissioned_after="2022-01-01", commissioned_before="2024-01-01"
+            ),
+            ["Lidar 2", "Lidar 3"],
+        )
+
+    def test_pagination(self):
+        names = []
+        url = "/instruments?limit=2&type=Doppler+lidar"
+        with self.assertNumQueries(8):
+            while url:
+                data = self.client.get(url).json()
+                self.assertLessEqual(len(data["results"]), 2)
+                names += [item["name"] for item in data["results"]]
+                url = data["next"]
+        self.assertEqual(names, ["Lidar 0", "Lidar 2", "Lidar 3", "Lidar 4"])
+
+    def test_drafts_hidden(self):
+        Instrument.objects.create(name="Draft lidar")
+        self.assertNotIn("Draft lidar", self._names())
+        self.client.force_login(User.objects.create_user("user"))
+        self.assertIn("Draft lidar", self._names())
+
+    def test_invalid(self):
+        for params in ({"date": "yesterday"}, {"pi": "123"}, {"limit": "0"}):
+            self.assertEqual(self.client.get("/instruments", params).status_code, 400)
+
+
+class DeploymentsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        hyytiala = Location.objects.create(name="Hyytiälä")
+        kenttarova = Location.objects.create(name="Kenttärova")
+        lidar = Instrument.objects.create(
+            name="Lidar", pid="https://hdl.handle.net/21.12132/3.lidar"
+        )
+        radar = Instrument.objects.create(
+            name="Radar", pid="https://hdl.handle.net/21.12132/3.radar"
+        )
+        Campaign.objects.create(
+            instrument=lidar,
+            location=hyytiala,
+            date_range=(datetime.date(2020, 1, 1), datetime.date(2021, 1, 1)),
+        )
+        Campaign.objects.create(
+            instrument=lidar,
+            location=kenttarova,
+            date_range=(datetime.date(2021, 1, 1), None),
+        )
+        Campaign.objects.create(
+            instrument=radar,
+            location=hyytiala,
+            date_range=(datetime.date(2020, 6, 1), datetime.date(2020, 7, 1)),
+        )
+
+    def _deployments(self, **params) -> list[tuple[str, str]]:
+        response = self.client.get("/deployments", params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            (item["location"], item["instrument"]["name"]) for item in response.json()
+        ]
+
+    def test_date(self):
+        self.assertEqual(
+            self._deployments(date="2020-06-15"),
+            [("Hyytiälä", "Lidar"), ("Hyytiälä", "Radar")],
+        )
+        self.assertEqual(self._deployments(date="2020-12-31"), [("Hyytiälä", "Lidar")])
+        self.assertEqual(
+            self._deployments(date="2021-01-01"), [("Kenttärova", "Lidar")]
+        )
+        self.assertEqual(
+            self._deployments(date="2020-06-15", location="Kenttärova"), []
+        )
+
+    def test_range(self):
+        self.assertEqual(
+            self._deployments(start="2020-07-01", end="2021-01-01"),
+            [("Hyytiälä", "Lidar"), ("Kenttärova", "Lidar")],
+        )
+        self.assertEqual(
+            self._deployments(
+                start="2020-06-30", end="2020-06-30", location="Hyytiälä"
+            ),
+            [("Hyytiälä", "Lidar"), ("Hyytiälä", "Radar")],
+        )
+        self.assertEqual(
+            self._deployments(start="2030-01-01"), [("Kenttärova", "Lidar")]
+        )
+
+    def test_drafts_hidden(self):
+        Campaign.objects.create(
+            instrument=Instrument.objects.create(name="Draft"),
+            location=Location.objects.get(name="Hyytiälä"),
+            date_range=(datetime.date(2020, 1, 1), None),
+        )
+        self.assertEqual(self._deployments(date="2020-12-31"), [("Hyytiälä", "Lidar")])
+        self.client.force_login(User.objects.create_user("user"))
+        self.assertEqual(
+            self._deployments(date="2020-12-31"),
+            [("Hyytiälä", "Draft"), ("Hyytiälä", "Lidar")],
+        )
+
+    def test_invalid(self):
+        self.assertEqual(self.client.get("/deployments").status_code, 400)
+        self.assertEqual(
+            self.client.get("/deployments", {"date": "today"}).status_code, 400
+        )
+        self.assertEqual(
+            self.client.get(
+                "/deployments", {"start": "2021-01-01", "end": "2020-01-01"}
+            ).status_code,
+            400,
+        )
+
+
+class PiBatchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.instruments = [
+            Instrument.objects.create(name=f"Lidar {i}") for i in range(3)
+        ]
+        for i, name in enumerate(["Ewan", "Simo"]):
+            person = Person.objects.create(first_name=name, last_name="PI")
+            for instrument in cls.instruments[:2]:
+                Contact.objects.create(
+                    person=person,
+                    instrument=instrument,
+                    role=Contact.PI,
+                    date_range=(
+                        datetime.date(2020 + i, 1, 1),
+                        datetime.date(2021, 1, 1) if i == 0 else None,
+                    ),
+                )
+        Contact.objects.create(
+            person=person,
+            instrument=cls.instruments[0],
+            role=Contact.EXTRA,
+            date_range=(datetime.date(2020, 1, 1), None),
+        )
+
+    def _post(self, queries):
+        return self.client.post("/pi", json.dumps(queries), "application/json")
+
+    def test_batch(self):
+        queries = [
+            {"uuid": str(self.instruments[0].uuid), "date": "2020-06-01"},
+            {"uuid": str(self.instruments[1].uuid), "date": "2022-06-01"},
+            {"uuid": str(self.instruments[0].uuid)},
+            {"uuid": str(self.instruments[2].uuid), "date": "2020-06-01"},
+            {"uuid": "0f0e4c3c-8c2d-4a55-9c57-1b5a7dbd6e01", "date": "2020-06-01"},
+        ]
+        with self.assertNumQueries(1):
+            response = self._post(queries)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), len(queries))
+        for query, item in zip(queries, data):
+            self.assertEqual(item["uuid"], query["uuid"])
+            single = self.client.get(
+                f"/instrument/{query['uuid']}/pi",
+                {"date": query["date"]} if "date" in query else {},
+            )
+            if single.status_code == 200:
+                self.assertEqual(item["pis"], single.json())
+        self.assertEqual([len(item["pis"]) for item in data], [1, 1, 2, 0, 0])
+
+    def test_invalid(self):
+        self.assertEqual(self._post([{"uuid": "x"}]).status_code, 400)
+        self.assertEqual(self._post({"uuid": "x"}).status_code, 400)
+        self.assertEqual(self._post([{"uuid": 123}]).status_code, 400)
+        self.assertEqual(self._post([{"uuid": [], "date": 1}]).status_code, 400)
+        self.assertEqual(self.client.get("/pi").status_code, 405)
+
+    def test_preflight(self):
+        response = self.client.options("/pi")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Access-Control-Allow-Origin"], "*")
+        self.assertEqual(
+            response.headers["Access-Control-Allow-Headers"], "Content-Type"
+        )
+
+
+class ServiceDatesTest(TestCase):
+    def test_annotation(self):
+        instrument = Instrument.objects.create(name="Lidar")
+        location = Location.objects.create(name="Hyytiälä")
+        for start, end in [
+            (datetime.date(2021, 1, 1), None),
+            (datetime.date(2019, 1, 1), datetime.date(2020, 1, 1)),
+            (datetime.date(2020, 1, 1), datetime.date(2021, 1, 1)),
+        ]:
+            Campaign.objects.create(
+                instrument=instrument, location=location, date_range=(start, end)
+            )
+        other = Instrument.objects.create(name="Unused")
+        instruments = Instrument.objects.with_service_dates().order_by(
+            "-commissioned_on"
+        )
+        with self.assertNumQueries(1):
+            dates = [
+                (instru.name, instru.commission_date, instru.decommission_date)
+                for instru in instruments
+            ]
+        self.assertEqual(
+            dates,
+            [("Unused", None, None), ("Lidar", datetime.date(2019, 1, 1), None)],
+        )
+        self.assertEqual(instrument.commission_date, datetime.date(2019, 1, 1))
+        self.assertIsNone(instrument.decommission_date)
+        self.assertIsNone(other.commission_date)
+
+        instrument.campaign_set.filter(date_range__upper_inf=True).delete()
+        annotated = Instrument.objects.with_service_dates().get(pk=instrument.pk)
+        self.assertEqual(annotated.decommission_date, datetime.date(2021, 1, 1))
+        self.assertEqual(
+            annotated.decommission_date,
+            Instrument.objects.get(pk=instrument.pk).decommission_date,
+        )
+
+    def test_pidinst_skips_campaigns(self):
+        instrument = Instrument.objects.create(name="Lidar")
+        Campaign.objects.create(
+            instrument=instrument,
+            location=Location.objects.create(name="Hyytiälä"),
+            date_range=(datetime.date(2019, 1, 1), datetime.date(2020, 1, 1)),
+        )
+        with self.assertNumQueries(9):
+            expected = pidinst_many(Instrument.objects.all())
+        with self.assertNumQueries(8):
+            documents = pidinst_many(Instrument.objects.with_service_dates())
+        self.assertEqual(documents, expected)
+        self.assertIn("Dates", documents[0])
+
+
+class AssemblyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        model = Model.objects.create(name="CHM 15k")
+        model.types.add(Type.objects.create(name="Ceilometer"))
+        cls.instruments = {
+            name: Instrument.objects.create(
+                name=name, model=model if name == "ceilometer" else None
+            )
+            for name in ["station", "lidar", "ceilometer", "scanner", "power", "mast"]
+        }
+        cls.instruments["scanner"].types.add(Type.objects.create(name="Scanner"))
+        for parent, child in [
+            ("station", "lidar"),
+            ("station", "ceilometer"),
+            ("lidar", "scanner"),
+            ("station", "power"),
+            ("mast", "power"),
+        ]:
+            cls.instruments[parent].components.add(cls.instruments[child])
+
+    def _tree(self, name: str) -> list:
+        def simplify(item: dict) -> tuple:
+            return (
+                item["name"],
+                item["types"],
+                [simplify(child) for child in item["components"]],
+            )
+
+        url = f"/instrument/{self.instruments[name].uuid}/tree"
+        return [simplify(item) for item in self.client.get(url).json()]
+
+    def test_tree(self):
+        station: tuple = (
+            "station",
+            [],
+            [
+                ("lidar", [], [("scanner", ["Scanner"], [])]),
+                ("ceilometer", ["Ceilometer"], []),
+                ("power", [], []),
+            ],
+        )
+        self.assertEqual(self._tree("scanner"), [station])
+        self.assertEqual(self._tree("station"), [station])
+        self.assertEqual(
+            self._tree("power"), [station, ("mast", [], [("power", [], [])])]
+        )
+
+    def test_queries(self):
+        with self.assertNumQueries(4):
+            roots = self.instruments["scanner"].assembly()
+            for node in roots[0].components:
+                list(node.instrument.get_types())
+
+    def test_cycle(self):
+        self.instruments["scanner"].components.add(self.instruments["station"])
+        self.assertEqual(len(self._tree("lidar")), 1)
@@ -5,6 +5,10 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("instruments", views.list_instruments, name="list_instruments"),
+    path("instruments.ndjson", views.export_json, name="export_json"),
+    path("instruments.xml", views.export_xml, name="export_xml"),
+    path("instruments/search", views.search_instruments, name="search"),
     path(
         "instrument/<instrument_uuid>.<output_format>",
         views.instrument,
@@ -15,6 +19,11 @@ urlpatterns = [
         "instrument/<instrument_uuid>/create_pid", views.create_pid, name="create_pid"
     ),
     path("instrument/<instrument_uuid>/pi", views.pi, name="pi"),
+    path("instrument/<instrument_uuid>/versions", views.versions, name="versions"),
+    path("instrument/<instrument_uuid>/tree", views.tree, name="tree"),
+    path("pi", views.pi_batch, name="pi_batch"),
+    path("deployments", views.deployments, name="deployments"),
+    path("ror/search", views.ror_search, name="ror_search"),
     path(
         "login",
         auth_views.LoginView.as_view(template_name="instruments/login.html"),
@@ -1,48 +1,200 @@
 import datetime
+import hashlib
+import json
+import logging
 import re
+import uuid
 from datetime import date
+from typing import Any, Callable, NamedTuple
 
+import requests
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import permission_required
-from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.contrib.postgres.expressions import ArraySubquery  # type: ignore[import]
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, Prefetch, Q, prefetch_related_objects
+from django.db.models.functions import Length
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 
 from logbook.views import can_view_logbook
 
+from . import documents, pidinst_xml, ror, search
 from .decorators import cors
-from .models import Instrument, Location, Person
+from .fields import parse_orcid_id, parse_ror_id
+from .models import (
+    AssemblyNode,
+    Campaign,
+    Contact,
+    Instrument,
+    InstrumentQuerySet,
+    Organization,
+    Person,
+    PidJob,
+    RelatedIdentifier,
+    RorRecord,
+    Type,
+    Variable,
+)
+from .version import __version__
+
+logger = logging.getLogger(__name__)
 
 
 def _instrument_json(request: HttpRequest, instru: Instrument) -> HttpResponse:
-    return JsonResponse(instru.pidinst())
+    return HttpResponse(documents.get_json(instru), content_type="application/json")
+
+
+# Queries behind the landing page of an anonymous visitor, counting the
+# instrument itself. Sessions, permissions and thumbnails come on top, but the
+# total never depends on how many campaigns, PIs or components there are.
+INSTRUMENT_PAGE_QUERIES = 14
+
+
+class InstrumentPage(NamedTuple):
+    instrument: Instrument
+    image: Any
+    image_attribution: str | None
+    owners: tuple[Organization, ...]
+    manufacturers: tuple[Organization, ...]
+    types: tuple[Type, ...]
+    variables: tuple[Variable, ...]
+    campaigns: tuple[Campaign, ...]
+    pis: tuple[Contact, ...]
+    components: tuple[Instrument, ...]
+    parents: tuple[Instrument, ...]
+    previous_version: Instrument | None
+    new_version: Instrument | None
+    related_identifiers: tuple[RelatedIdentifier, ...]
+    can_view_logbook: bool
+    pid_pending: bool
+    citation: str
+
+
+def _range_key(obj: Campaign | Contact) -> tuple:
+    """Sort key matching PostgreSQL's ordering of `date_range`."""
+    lower, upper = obj.date_range.lower, obj.date_range.upper
+    return (lower is not None, lower or date.min, upper is None, upper or date.max)
+
+
+def _instrument_page(request: HttpRequest, instru: Instrument) -> InstrumentPage:
+    """Load everything on the landing page in one pass over the relations."""
+    lookups: list[str | Prefetch] = [
+        "owners",
+        Prefetch("campaign_set", Campaign.objects.select_related("location")),
+        Prefetch(
+            "contact_set",
+            Contact.objects.filter(role=Contact.PI).select_related("person"),
+            to_attr="pi_contacts",
+        ),
+        Prefetch(
+            "components",
+            Instrument.objects.select_related("model").prefetch_related("model__types"),
+        ),
+        "component_of",
+        "instrument_set",
+        "new_version",
+        "related_identifiers",
+    ]
+    if instru.model_id is not None:
+        lookups += ["model__manufacturers", "model__types", "model__variables"]
+    else:
+        lookups += ["manufacturers", "types"]
+    prefetch_related_objects([instru], *lookups)
+    campaigns = sorted(instru.campaign_set.all(), key=_range_key, reverse=True)
+    pis = sorted(instru.pi_contacts, key=_range_key, reverse=True)
+    return InstrumentPage(
+        instrument=instru,
+        image=instru.get_image(),
+        image_attribution=instru.get_image_attribution(),
+        owners=tuple(instru.owners.all()),
+        manufacturers=tuple(instru.get_manufacturers()),
+        types=tuple(instru.get_types()),
+        variables=tuple(instru.get_variables()),
+        campaigns=tuple(campaigns),
+        pis=tuple(pis),
+        components=tuple(instru.components.all()),
+        parents=tuple(instru.parents),
+        previous_version=instru.previous_version,
+        new_version=instru.new_version,
+        related_identifiers=tuple(instru.related_identifiers.all()),
+        can_view_logbook=can_view_logbook(request, instru),
+        pid_pending=not instru.pid
+        and request.user.has_perm("instruments.can_create_pid")
+        and instru.pid_jobs.filter(
+            status__in=[PidJob.PENDING, PidJob.RUNNING]
+        ).exists(),
+        citation=_cite_instrument(instru, pis),
+    )
 
 
 def _instrument_html(request: HttpRequest, instru: Instrument) -> HttpResponse:
     return render(
         request,
         "instruments/instrument.html",
-        {
-            "instrument": instru,
-            "can_view_logbook": can_view_logbook(request, instru),
-            "citation": _cite_instrument(instru),
-        },
+        {"instrument": instru, "page": _instrument_page(request, instru)},
     )
 
 
 def _instrument_xml(request: HttpRequest, instru: Instrument) -> HttpResponse:
-    return render(
-        request,
-        "instruments/instrument.xml",
-        {"instrument": instru},
-        "application/xml",
-    )
+    return HttpResponse(documents.get_xml(instru), content_type="application/xml")
+
+
+def _conditional_response(
+    request: HttpRequest,
+    instru: Instrument,
+    handler: Callable[[HttpRequest, Instrument], HttpResponse],
+) -> HttpResponse:
+    last_modified = instru.updated_at
+    validators = [
+        handler.__name__,
+        str(instru.uuid),
+        last_modified.isoformat(),
+        __version__,
+        settings.PUBLIC_URL,
+    ]
+    if handler is _instrument_html:
+        # Pages of logged-in users contain a CSRF token.
+        if request.user.is_authenticated:
+            return handler(request, instru)
+        # Citation depends on the current date.
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        validators.append(today.isoformat())
+        last_modified = max(
+            last_modified,
+            datetime.datetime.combine(today, datetime.time(), datetime.timezone.utc),
+        )
+    etag = quote_etag(hashlib.sha256(":".join(validators).encode()).hexdigest())
+    timestamp = int(last_modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    ) or handler(request, instru)
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(timestamp)
+    return response
 
 
 @cors(allow_origin="*")
 def instrument(
     request: HttpRequest, instrument_uuid: str, output_format: str | None = None
 ) -> HttpResponse:
-    instru = get_object_or_404(Instrument, uuid=instrument_uuid)
+    instru = get_object_or_404(
+        Instrument.objects.with_service_dates(), uuid=instrument_uuid
+    )
 
     # A single UUID has multiple textual representations with differences in
     # dashes and letter case. Let's accept the different representations but
@@ -62,7 +214,7 @@ def instrument(
     }
     if output_format is not None:
         if handler := output_formats.get(output_format):
-            return handler(request, instru)
+            return _conditional_response(request, instru, handler)
         raise Http404()
 
     # Content negotiation with "Accept" header.
@@ -75,38 +227,195 @@ def instrument(
     for accepted_type in request.accepted_types:
         for content_type, handler in output_formats.items():
             if accepted_type.match(content_type):
-                return handler(request, instru)
+                response = _conditional_response(request, instru, handler)
+                patch_vary_headers(response, ("Accept",))
+                return response
 
     return HttpResponse(
         "Unsupported format requested", status=406, content_type="text/plain"
     )
 
 
-def index(request: HttpRequest) -> HttpResponse:
-    instruments = Instrument.objects.filter(component_of=None, new_version__isnull=True)
-    if not request.user.is_authenticated:
-        instruments = instruments.filter(pid__isnull=False)
+@cors(allow_origin="*")
+def export_json(request: HttpRequest) -> StreamingHttpResponse:
+    instruments = (
+        Instrument.objects.filter(pid__isnull=False).order_by("pk").with_pidinst()
+    )
+    lines = (
+        json.dumps(instru.pidinst(), cls=DjangoJSONEncoder) + "\n"
+        for instru in instruments.iterator(chunk_size=500)
+    )
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+LIST_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = 1000
+
+
+def _filter_instruments(params) -> InstrumentQuerySet:
+    instruments = Instrument.objects.with_service_dates()
+    date_param = params.get("date")
+    location = params.get("location")
+    if date_param or location:
+        instruments = instruments.deployed(
+            date=datetime.date.fromisoformat(date_param) if date_param else None,
+            location=location,
+        )
+    if type_name := params.get("type"):
+        instruments = instruments.of_type(type_name)
+    if model_name := params.get("model"):
+        instruments = instruments.filter(model__name=model_name)
+    if owner := params.get("owner"):
+        instruments = instruments.filter(owners__ror_id=parse_ror_id(owner))
+    if pi := params.get("pi"):
+        instruments = instruments.with_pi(parse_orcid_id(pi))
+    if commissioned_after := params.get("commissioned_after"):
+        instruments = instruments.filter(
+            commissioned_on__gte=datetime.date.fromisoformat(commissioned_after)
+        )
+    if commissioned_before := params.get("commissioned_before"):
+        instruments = instruments.filter(
+            commissioned_on__lt=datetime.date.fromisoformat(commissioned_before)
+        )
+    return instruments
+
 
-    locations: list = []
-    for location in Location.objects.order_by("name"):
-        locations.append(
-            {
-                "name": location.name,
-                "instruments": instruments.filter(
-                    campaign__location=location,
-                    campaign__date_range__contains=date.today(),
-                ),
-            }
+@cors(allow_origin="*")
+def list_instruments(request: HttpRequest) -> HttpResponse:
+    """List instruments a page at a time, ordered by an opaque cursor."""
+    try:
+        instruments = _filter_instruments(request.GET)
+        if not request.user.is_authenticated:
+            instruments = instruments.filter(pid__isnull=False)
+        limit = min(int(request.GET.get("limit", LIST_PAGE_SIZE)), LIST_MAX_PAGE_SIZE)
+        if cursor := request.GET.get("cursor"):
+            instruments = instruments.filter(pk__gt=int(cursor))
+    except (ValueError, ValidationError) as err:
+        return JsonResponse({"error": str(err)}, status=400)
+    if limit < 1:
+        return JsonResponse({"error": "Limit must be positive."}, status=400)
+    page = list(
+        instruments.select_related("model")
+        .only("uuid", "pid", "name", "serial_number", "model__name")
+        .prefetch_related(
+            Prefetch("owners", Organization.objects.only("name", "ror_id")),
+            Prefetch("types", Type.objects.only("name")),
+            Prefetch("model__types", Type.objects.only("name")),
         )
-    locations.append(
+        .order_by("pk")[: limit + 1]
+    )
+    next_url = None
+    if len(page) > limit:
+        page = page[:limit]
+        params = request.GET.copy()
+        params["cursor"] = str(page[-1].pk)
+        next_url = request.build_absolute_uri("?" + params.urlencode())
+    results = [
         {
-            "name": "Unknown",
-            "instruments": instruments.exclude(
-                campaign__date_range__contains=date.today()
-            ),
+            "uuid": instru.uuid,
+            "pid": instru.pid,
+            "name": instru.name,
+            "serial_number": instru.serial_number,
+            "model": instru.model.name if instru.model else None,
+            "types": [type.name for type in instru.get_types()],
+            "owners": [
+                {"name": owner.name, "ror_id": owner.ror_id}
+                for owner in instru.owners.all()
+            ],
+            "url": instru.landing_page,
+            "commission_date": instru.commission_date,
+            "decommission_date": instru.decommission_date,
+        }
+        for instru in page
+    ]
+    return JsonResponse({"results": results, "next": next_url})
+
+
+SEARCH_PAGE_SIZE = 20
+
+
+@cors(allow_origin="*")
+def search_instruments(request: HttpRequest) -> HttpResponse:
+    text = request.GET.get("q", "").strip()
+    if not text:
+        return JsonResponse({"error": "Missing query parameter q."}, status=400)
+    instruments = (
+        search.search(text)
+        .select_related("model")
+        .prefetch_related("types", "model__types")
+    )
+    if not request.user.is_authenticated:
+        instruments = instruments.filter(pid__isnull=False)
+    page = Paginator(instruments, SEARCH_PAGE_SIZE).get_page(request.GET.get("page"))
+    results = [
+        {
+            "uuid": instru.uuid,
+            "pid": instru.pid,
+            "name": instru.name,
+            "serial_number": instru.serial_number,
+            "model": instru.model.name if instru.model else None,
+            "types": [type.name for type in instru.get_types()],
+            "url": instru.landing_page,
+            "rank": instru.rank,
+        }
+        for instru in page
+    ]
+    return JsonResponse(
+        {
+            "count": page.paginator.count,
+            "page": page.number,
+            "pages": page.paginator.num_pages,
+            "results": results,
         }
     )
 
+
+@cors(allow_origin="*")
+def export_xml(request: HttpRequest) -> StreamingHttpResponse:
+    instruments = (
+        Instrument.objects.filter(pid__isnull=False).order_by("pk").with_pidinst()
+    )
+    chunks = pidinst_xml.iter_xml(
+        instru.pidinst() for instru in instruments.iterator(chunk_size=500)
+    )
+    return StreamingHttpResponse(chunks, content_type="application/xml")
+
+
+def index(request: HttpRequest) -> HttpResponse:
+    # An instrument is listed under every location where it is deployed today.
+    current_campaigns = Campaign.objects.filter(
+        instrument=OuterRef("pk"), date_range__contains=date.today()
+    ).order_by("location_id")
+    instruments = (
+        Instrument.objects.filter(component_of=None, new_version__isnull=True)
+        .annotate(
+            current_location_ids=ArraySubquery(current_campaigns.values("location_id")),
+            current_location_names=ArraySubquery(
+                current_campaigns.values("location__name")
+            ),
+        )
+        .select_related("model")
+        .prefetch_related("types", "model__types")
+        .order_by("pk")
+    )
+    if not request.user.is_authenticated:
+        instruments = instruments.filter(pid__isnull=False)
+
+    groups: dict[tuple[str, int], list[Instrument]] = {}
+    unknown = []
+    for instru in instruments:
+        if not instru.current_location_ids:
+            unknown.append(instru)
+        for key in dict.fromkeys(
+            zip(instru.current_location_names, instru.current_location_ids)
+        ):
+            groups.setdefault(key, []).append(instru)
+    locations = [
+        {"name": name, "instruments": group}
+        for (name, _), group in sorted(groups.items())
+    ]
+    locations.append({"name": "Unknown", "instruments": unknown})
+
     return render(
         request,
         "instruments/index.html",
@@ -121,15 +430,149 @@ def pi(request: HttpRequest, instrument_uuid: str) -> HttpResponse:
     if date_param := request.GET.get("date"):
         date_in = datetime.date.fromisoformat(date_param)
         pis = pis.filter(date_range__contains=date_in)
+    data = [_pi_json(pi) for pi in pis]
+    return JsonResponse(data, safe=False)
+
+
+@cors(allow_origin="*")
+def versions(request: HttpRequest, instrument_uuid: str) -> HttpResponse:
+    instru = get_object_or_404(Instrument, uuid=instrument_uuid)
+    data = [
+        {
+            "uuid": version.uuid,
+            "pid": version.pid,
+            "name": version.name,
+            "url": version.landing_page,
+            "offset": version.version_offset,
+        }
+        for version in instru.versions()
+    ]
+    return JsonResponse(data, safe=False)
+
+
+def _assembly_json(node: AssemblyNode) -> dict:
+    instru = node.instrument
+    return {
+        "uuid": instru.uuid,
+        "pid": instru.pid,
+        "name": instru.name,
+        "types": [type.name for type in instru.get_types()],
+        "url": instru.landing_page,
+        "components": [_assembly_json(child) for child in node.components],
+    }
+
+
+@cors(allow_origin="*")
+def tree(request: HttpRequest, instrument_uuid: str) -> HttpResponse:
+    """List assembly trees of the top-level systems containing an instrument."""
+    instru = get_object_or_404(Instrument, uuid=instrument_uuid)
+    data = [_assembly_json(root) for root in instru.assembly()]
+    return JsonResponse(data, safe=False)
+
+
+def _pi_json(pi: Contact) -> dict:
+    return {
+        "first_name": pi.person.first_name,
+        "last_name": pi.person.last_name,
+        "orcid_id": pi.person.orcid_id,
+        "start_date": pi.date_range.lower,
+        "end_date": pi.date_range.upper,
+    }
+
+
+@csrf_exempt
+@cors(allow_origin="*")
+@require_http_methods(["POST", "OPTIONS"])
+def pi_batch(request: HttpRequest) -> HttpResponse:
+    """Find PIs of many instruments at once.
+
+    The request body is a JSON list of objects with `uuid` and optional
+    `date`. The response lists the PIs for each of them in the same order,
+    like `pi` would. Unknown instruments have no PIs.
+    """
+    if request.method == "OPTIONS":
+        # Preflight of cross-origin requests with a JSON body.
+        response = HttpResponse()
+        response.headers["Access-Control-Allow-Methods"] = "POST"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+        return response
+    try:
+        queries = [
+            (
+                str(uuid.UUID(item["uuid"])),
+                datetime.date.fromisoformat(item["date"]) if item.get("date") else None,
+            )
+            for item in json.loads(request.body)
+        ]
+    except (ValueError, TypeError, KeyError, AttributeError) as err:
+        return JsonResponse({"error": f"Invalid request: {err}"}, status=400)
+    pis: dict[str, list[Contact]] = {}
+    for contact in Contact.objects.pis_on(queries).select_related("person"):
+        pis.setdefault(str(contact.instrument_uuid), []).append(contact)
+    data = [
+        {
+            "uuid": instrument_uuid,
+            "date": date_in,
+            "pis": [
+                _pi_json(pi)
+                for pi in pis.get(instrument_uuid, [])
+                if date_in is None or date_in in pi.date_range
+            ],
+        }
+        for instrument_uuid, date_in in queries
+    ]
+    return JsonResponse(data, safe=False)
+
+
+@cors(allow_origin="*")
+def deployments(request: HttpRequest) -> HttpResponse:
+    """List campaigns on `date` or overlapping `start` to `end`, inclusive."""
+    try:
+        if date_param := request.GET.get("date"):
+            date_in = datetime.date.fromisoformat(date_param)
+            date_filter = Q(date_range__contains=date_in)
+        elif start_param := request.GET.get("start"):
+            start = datetime.date.fromisoformat(start_param)
+            end = None
+            if end_param := request.GET.get("end"):
+                end = datetime.date.fromisoformat(end_param)
+                if end < start:
+                    return JsonResponse({"error": "End is before start."}, status=400)
+                end += datetime.timedelta(1)
+            date_filter = Q(date_range__overlap=(start, end))
+        else:
+            return JsonResponse({"error": "Give date or start."}, status=400)
+    except ValueError as err:
+        return JsonResponse({"error": str(err)}, status=400)
+    campaigns = Campaign.objects.filter(date_filter)
+    if not request.user.is_authenticated:
+        campaigns = campaigns.filter(instrument__pid__isnull=False)
+    if location := request.GET.get("location"):
+        campaigns = campaigns.filter(location__name=location)
+    campaigns = (
+        campaigns.select_related("location", "instrument")
+        .only(
+            "date_range",
+            "location__name",
+            "instrument__uuid",
+            "instrument__pid",
+            "instrument__name",
+        )
+        .order_by("location__name", "instrument__name", "date_range")
+    )
     data = [
         {
-            "first_name": pi.person.first_name,
-            "last_name": pi.person.last_name,
-            "orcid_id": pi.person.orcid_id,
-            "start_date": pi.date_range.lower,
-            "end_date": pi.date_range.upper,
+            "location": campaign.location.name,
+            "instrument": {
+                "uuid": campaign.instrument.uuid,
+                "pid": campaign.instrument.pid,
+                "name": campaign.instrument.name,
+                "url": campaign.instrument.landing_page,
+            },
+            "start_date": campaign.date_range.lower,
+            "end_date": campaign.date_range.upper,
         }
-        for pi in pis
+        for campaign in campaigns
     ]
     return JsonResponse(data, safe=False)
 
@@ -137,11 +580,42 @@ def pi(request: HttpRequest, instrument_uuid: str) -> HttpResponse:
 @permission_required("instruments.can_create_pid")
 def create_pid(request: HttpRequest, instrument_uuid: str) -> HttpResponse:
     instru = get_object_or_404(Instrument, uuid=instrument_uuid)
-    instru.create_or_update_pid()
-    instru.update_related_pids()
+    PidJob.enqueue(instru)
     return redirect("instrument", instrument_uuid=instru.uuid, output_format="html")
 
 
+ROR_SEARCH_LIMIT = 20
+
+
+@staff_member_required
+def ror_search(request: HttpRequest) -> HttpResponse:
+    query = request.GET.get("query", "").strip()
+    if not query:
+        return JsonResponse({"items": []})
+    items = {}
+    known = Organization.objects.filter(ror_id__isnull=False).filter(
+        Q(name__icontains=query) | Q(acronym__icontains=query)
+    )
+    for org in known.order_by("name")[:ROR_SEARCH_LIMIT]:
+        items[org.ror_id] = {
+            "id": f"https://ror.org/{org.ror_id}",
+            "name": org.name,
+            "acronyms": [org.acronym] if org.acronym else [],
+        }
+    records = RorRecord.objects.filter(search_text__contains=query.lower()).order_by(
+        Length("name"), "name"
+    )
+    for record in records[:ROR_SEARCH_LIMIT]:
+        items.setdefault(record.ror_id, record.summary())
+    if not items:
+        try:
+            for item in ror.search(query.lower()):
+                items.setdefault(item["id"], item)
+        except requests.RequestException:
+            logger.exception("ROR search failed")
+    return JsonResponse({"items": list(items.values())[:ROR_SEARCH_LIMIT]})
+
+
 def _format_list(values: list) -> str:
     if len(values) < 2:
         return "".join(values)
@@ -156,9 +630,9 @@ def _cite_person(person: Person) -> str:
     )
 
 
-def _cite_instrument(instru: Instrument) -> str:
+def _cite_instrument(instru: Instrument, pis: list[Contact]) -> str:
     today = datetime.datetime.now(datetime.timezone.utc).date()
-    contacts = instru.pis.filter(date_range__contains=today)
+    contacts = [pi for pi in pis if today in pi.date_range]
     authors = _format_list([_cite_person(contact.person) for contact in contacts])
     publisher = "ACTRIS Cloud remote sensing data centre unit (CLU)"
     return f"{authors} ({today.year}). {instru.name}. {publisher}. {instru.pid or instru.landing_page}"
@@ -0,0 +1,259 @@
+"""Access to concepts of the ACTRIS vocabulary.
+
+Concepts can be read from the vocabulary server (`OnlineVocabulary`) or from
+a local SKOS dump in JSON-LD (`OfflineVocabulary`).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Protocol
+
+from . import httpclient
+
+
+class ConceptFetcher:
+    """Fetches concept graphs concurrently and caches them on disk.
+
+    Cached graphs younger than `max_age` seconds are used as is. Older ones are
+    revalidated using the ETag and Last-Modified headers of the response they
+    were stored from.
+    """
+
+    def __init__(
+        self, cache_dir: Path | None = None, max_age: float = 0, workers: int = 8
+    ):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.workers = workers
+        self._graphs: dict[str, list[dict]] = {}
+
+    def _cache_path(self, url: str) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / (hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _read_cache(self, url: str) -> dict | None:
+        path = self._cache_path(url)
+        if path is None or not path.exists():
+            return None
+        with path.open() as f:
+            return json.load(f)
+
+    def _write_cache(self, url: str, entry: dict) -> None:
+        path = self._cache_path(url)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, delete=False, suffix=".tmp"
+        ) as f:
+            json.dump(entry, f)
+        os.replace(f.name, path)
+
+    def _fetch(self, url: str) -> list[dict]:
+        entry = self._read_cache(url)
+        if entry is not None and time.time() - entry["fetched_at"] < self.max_age:
+            return entry["graph"]
+        headers = {"accept": "application/json"}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = httpclient.get(url, headers=headers)
+        if entry is not None and response.status_code == 304:
+            entry["fetched_at"] = time.time()
+        else:
+            response.raise_for_status()
+            entry = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+                "graph": response.json()["graph"],
+            }
+        self._write_cache(url, entry)
+        return entry["graph"]
+
+    def fetch_many(self, urls: Iterable[str]) -> None:
+        missing = sorted(set(urls) - self._graphs.keys())
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            graphs = list(executor.map(self._fetch, missing))
+        self._graphs.update(zip(missing, graphs))
+
+    def graph(self, url: str) -> list[dict]:
+        self.fetch_many([url])
+        return self._graphs[url]
+
+
+class ConceptNotFound(LookupError):
+    """Raised when a concept is missing from the vocabulary."""
+
+
+class Vocabulary(Protocol):
+    def prefetch(self, concept_urls: Iterable[str], ancestor_url: str) -> None:
+        ...
+
+    def label(self, concept_url: str) -> str:
+        ...
+
+    def broader(self, concept_url: str) -> list[str]:
+        ...
+
+    def descends_from(self, concept_url: str, ancestor_url: str) -> bool:
+        ...
+
+
+def _as_list(value) -> list:
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+class OnlineVocabulary:
+    def __init__(self, fetcher: ConceptFetcher):
+        self.fetcher = fetcher
+
+    def _concept(self, concept_url: str) -> dict:
+        graph = self.fetcher.graph(concept_url)
+        return next(item for item in graph if item["uri"] == concept_url)
+
+    def prefetch(
+        self, concept_urls: Iterable[str], ancestor_url: str, max_depth: int = 10
+    ) -> None:
+        """Fetch graphs needed by `descends_from` one level at a time."""
+        concept_urls = set(concept_urls)
+        self.fetcher.fetch_many(concept_urls)
+        seen: set[str] = set()
+        frontier = {url for item in concept_urls for url in self.broader(item)}
+        for _ in range(max_depth):
+            frontier = frontier - seen - {ancestor_url}
+            if not frontier:
+                break
+            self.fetcher.fetch_many(frontier)
+            seen |= frontier
+            frontier = {url for item in frontier for url in self.broader(item)}
+
+    def label(self, concept_url: str) -> str:
+        return self._concept(concept_url)["prefLabel"]["value"]
+
+    def broader(self, concept_url: str) -> list[str]:
+        graph = self.fetcher.graph(concept_url)
+        concept = next(item for item in graph if item["uri"] == concept_url)
+        if "broader" not in concept:
+            return []
+        broader_urls = [item["uri"] for item in _as_list(concept["broader"])]
+        return [item["uri"] for item in graph if item["uri"] in broader_urls]
+
+    def descends_from(
+        self, concept_url: str, ancestor_url: str, max_depth: int = 10
+    ) -> bool:
+        if concept_url == ancestor_url:
+            return True
+        if max_depth == 0:
+            return False
+        for broader_url in self.broader(concept_url):
+            if self.descends_from(broader_url, ancestor_url, max_depth - 1):
+                return True
+        return False
+
+
+SKOS = "http://www.w3.org/2004/02/skos/core#"
+
+
+def _property(item: dict, name: str):
+    for key in (name, f"skos:{name}", SKOS + name):
+        if key in item:
+            return item[key]
+    return None
+
+
+def _uri(value) -> str:
+    if isinstance(value, str):
+        return value
+    return value.get("uri") or value["@id"]
+
+
+def _text(value) -> str:
+    values = _as_list(value)
+    for item in values:
+        if isinstance(item, dict) and item.get("@language", item.get("lang")) == "en":
+            value = item
+            break
+    else:
+        value = values[0]
+    if isinstance(value, str):
+        return value
+    return value.get("value") or value["@value"]
+
+
+class OfflineVocabulary:
+    """Concepts from a local vocabulary dump.
+
+    The transitive closure of `broader` is computed once on load, so
+    `descends_from` is a set lookup regardless of the depth of the hierarchy.
+    """
+
+    def __init__(self, items: Iterable[dict]):
+        self.labels: dict[str, str] = {}
+        self._broader: dict[str, list[str]] = {}
+        for item in items:
+            url = _uri(item)
+            label = _property(item, "prefLabel")
+            if label is not None:
+                self.labels[url] = _text(label)
+            broader = _property(item, "broader")
+            self._broader[url] = (
+                [_uri(value) for value in _as_list(broader)] if broader else []
+            )
+        for url, broader_urls in self._broader.items():
+            self._broader[url] = [b for b in broader_urls if b in self._broader]
+        self.ancestors: dict[str, frozenset[str]] = {}
+        for url in self._broader:
+            self.ancestors[url] = self._closure(url)
+
+    @classmethod
+    def load(cls, path: Path) -> "OfflineVocabulary":
+        with path.open() as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("@graph", data.get("graph"))
+        return cls(data)
+
+    def _closure(self, url: str) -> frozenset[str]:
+        ancestors: set[str] = set()
+        stack = list(self._broader[url])
+        while stack:
+            broader_url = stack.pop()
+            if broader_url in ancestors:
+                continue
+            ancestors.add(broader_url)
+            if broader_url in self.ancestors:
+                ancestors |= self.ancestors[broader_url]
+            else:
+                stack.extend(self._broader[broader_url])
+        return frozenset(ancestors)
+
+    def prefetch(self, concept_urls: Iterable[str], ancestor_url: str) -> None:
+        pass
+
+    def label(self, concept_url: str) -> str:
+        if concept_url not in self.labels:
+            raise ConceptNotFound(concept_url)
+        return self.labels[concept_url]
+
+    def broader(self, concept_url: str) -> list[str]:
+        if concept_url not in self._broader:
+            raise ConceptNotFound(concept_url)
+        return self._broader[concept_url]
+
+    def descends_from(self, concept_url: str, ancestor_url: str) -> bool:
+        return concept_url == ancestor_url or ancestor_url in self.ancestors.get(
+            concept_url, ()
+        )